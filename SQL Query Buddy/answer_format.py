@@ -0,0 +1,96 @@
+import re
+
+_sections = re.compile(r"\*\*(Explanation|SQL|Raw Results|AI-Driven Insight):\*\*", re.IGNORECASE)
+_sql_fence = re.compile(r"```(?:sql)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+_shown = re.compile(r"^\(showing \d[\d,]* of (\d[\d,]*) rows", re.MULTILINE)
+# The Raw Results block of an empty result.
+NO_ROWS = "(no rows)"
+
+
+def _cell(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, float):
+        # SUM() over REAL columns leaves float noise (61015.42000000001); six decimals keep the value exact enough.
+        value = round(value, 6)
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def render_rows(columns, rows, max_rows=50, handle=None):
+    """The Raw Results block: an aligned table of the first `max_rows` rows, then a line with the full count."""
+    if not rows:
+        return NO_ROWS
+    shown = [[_cell(value) for value in row] for row in rows[:max_rows]]
+    header = [str(column) for column in columns]
+    widths = [max(len(header[i]), *(len(row[i]) for row in shown)) for i in range(len(header))]
+
+    def line(cells):
+        return "| " + " | ".join(cell.ljust(width) for cell, width in zip(cells, widths)) + " |"
+
+    lines = [line(header), "| " + " | ".join("-" * width for width in widths) + " |"]
+    lines += [line(row) for row in shown]
+    if len(rows) > len(shown):
+        more = f"(showing {len(shown)} of {len(rows):,} rows"
+        lines.append(f"{more}; the rest via /results/{handle})" if handle else f"{more})")
+    return "\n".join(lines)
+
+
+def shown_row_total(raw):
+    """The full row count of a rendered block that was cut to a sample, else None."""
+    match = _shown.search(raw)
+    return int(match.group(1).replace(",", "")) if match else None
+
+
+def parse_answer(text):
+    """Splits a model answer into {explanation, sql, insight, follow_up}; parts it did not write are None.
+
+    The follow-up question is the last paragraph after the insight when it ends with a "?".
+    """
+    parts = {"explanation": None, "sql": None, "insight": None, "follow_up": None}
+    matches = list(_sections.finditer(text))
+    for match, following in zip(matches, matches[1:] + [None]):
+        body = text[match.end():following.start() if following else len(text)].strip()
+        name = match.group(1).lower()
+        if name == "explanation":
+            parts["explanation"] = body
+        elif name == "sql":
+            fenced = _sql_fence.search(body)
+            parts["sql"] = (fenced.group(1) if fenced else body).strip()
+        elif name == "ai-driven insight":
+            paragraphs = [p.strip() for p in re.split(r"\n\s*\n", body) if p.strip()]
+            if len(paragraphs) > 1 and paragraphs[-1].endswith("?"):
+                parts["follow_up"] = paragraphs.pop()
+            parts["insight"] = "\n\n".join(paragraphs)
+    return parts
+
+
+def assemble_answer(explanation=None, sql=None, raw_results=None, insight=None, follow_up=None):
+    """The markdown answer in the app's 4-part format, skipping the parts that are missing."""
+    sections = []
+    if explanation:
+        sections.append(f"**Explanation:**\n{explanation}")
+    if sql:
+        sections.append(f"**SQL:**\n```sql\n{sql}\n```")
+    if raw_results is not None:
+        sections.append(f"**Raw Results:**\n```\n{raw_results}\n```")
+    if insight:
+        sections.append(f"**AI-Driven Insight:**\n{insight}")
+    if follow_up:
+        sections.append(follow_up)
+    return "\n\n".join(sections)
+
+
+def build_answer(model_text, sql, columns, rows, max_rows=50, handle=None):
+    """Combines the model's explanation and insight with the SQL and rows that were actually executed.
+
+    Returns (markdown answer, parts). When the model did not use the answer format
+    (e.g. it replied to a greeting), its text is returned unchanged.
+    """
+    parts = parse_answer(model_text or "")
+    if sql is None and parts["sql"] is None:
+        return model_text, parts
+    if model_text and parts["explanation"] is None and parts["insight"] is None:
+        return model_text, parts
+    parts["sql"] = sql or parts["sql"]
+    parts["raw_results"] = render_rows(columns, rows, max_rows, handle) if columns is not None else None
+    return assemble_answer(**parts), parts
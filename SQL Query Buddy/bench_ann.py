@@ -0,0 +1,76 @@
+"""Compares the flat, HNSW and IVF-PQ schema index types on synthetic schema corpora.
+
+A corpus imitates a large database: one cluster per table, with a document per
+column scattered around it. Queries are noisy copies of documents. Recall@k is
+measured against exact search, and memory is the size of the serialized index.
+No API key is needed.
+
+    python bench_ann.py --sizes 1000 10000 100000 --dim 384 --k 10
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from index_builder import choose_index_type, make_index
+
+
+def synthetic_corpus(size, dim, columns_per_table=20, seed=0):
+    rng = np.random.default_rng(seed)
+    tables = rng.normal(size=(max(size // columns_per_table, 1), dim)).astype(np.float32)
+    owners = rng.integers(0, len(tables), size)
+    vectors = tables[owners] + 0.35 * rng.normal(size=(size, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def noisy_queries(corpus, count, seed=1):
+    rng = np.random.default_rng(seed)
+    queries = corpus[rng.integers(0, len(corpus), count)] + 0.05 * rng.normal(size=(count, corpus.shape[1]))
+    return queries.astype(np.float32)
+
+
+def measure(index, queries, truth, k):
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        _, found = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - started)
+        recalls.append(len(set(found[0]) & set(expected)) / k)
+    latencies.sort()
+    return {
+        "recall": sum(recalls) / len(recalls),
+        "mean_ms": 1000 * sum(latencies) / len(latencies),
+        "p95_ms": 1000 * latencies[int(0.95 * (len(latencies) - 1))],
+        "memory_mb": len(faiss.serialize_index(index)) / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'docs':>8} {'index':<7}{'build (s)':>10}{f'recall@{args.k}':>11}{'mean (ms)':>11}{'p95 (ms)':>10}{'memory (MB)':>13}  auto")
+    for size in args.sizes:
+        corpus = synthetic_corpus(size, args.dim)
+        queries = noisy_queries(corpus, args.queries)
+        exact = faiss.IndexFlatL2(args.dim)
+        exact.add(corpus)
+        _, truth = exact.search(queries, args.k)
+
+        chosen = choose_index_type(size)
+        for index_type in ("flat", "hnsw", "ivfpq"):
+            started = time.perf_counter()
+            index = make_index(index_type, corpus)
+            build_s = time.perf_counter() - started
+            r = measure(index, queries, truth, args.k)
+            marker = "*" if index_type == chosen else ""
+            print(f"{size:>8} {index_type:<7}{build_s:>10.2f}{r['recall']:>11.3f}{r['mean_ms']:>11.3f}{r['p95_ms']:>10.3f}{r['memory_mb']:>13.2f}  {marker}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compares the ReAct agent with the fixed pipeline mode using a stubbed LLM.
+
+Every stubbed model call sleeps for a fixed latency, so the difference between the
+modes comes from the number of model round trips. No API key is needed.
+
+    python bench_pipeline.py --questions 20 --llm-latency 0.3
+"""
+import argparse
+import asyncio
+import time
+
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.tools import create_retriever_tool
+from langchain_community.utilities.sql_database import SQLDatabase
+from langchain_community.tools.sql_database.tool import QuerySQLDatabaseTool
+from langchain.agents import create_agent
+
+from pipeline import QueryPipeline
+
+SQL = "SELECT p.category, SUM(oi.subtotal) FROM products p JOIN order_items oi ON p.product_id = oi.product_id GROUP BY p.category"
+ANSWER = "**Explanation:**\n...\n\n**SQL:**\n```sql\n" + SQL + "\n```\n\n**AI-Driven Insight:**\n..."
+
+
+class StubLLM(BaseChatModel):
+    """Plays the model's part in both modes and counts the calls it receives."""
+
+    latency: float = 0.3
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages):
+        last = messages[-1]
+        if isinstance(last, ToolMessage) and last.name == "schema_search":
+            return AIMessage(content="", tool_calls=[{"name": "sql_db_query", "args": {"query": SQL}, "id": "sql"}])
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=ANSWER)
+        if isinstance(messages[0], SystemMessage) and "NO_SQL" in messages[0].content:
+            return AIMessage(content=SQL)
+        if "has already been answered" in last.content:
+            return AIMessage(content=ANSWER)
+        return AIMessage(content="", tool_calls=[{"name": "schema_search", "args": {"query": last.content}, "id": "schema"}])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+
+class StubRetriever(BaseRetriever):
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return [Document(page_content="The 'products' table ... join 'order_items' on product_id.")]
+
+
+async def run_mode(runner, llm, questions):
+    llm.calls = 0
+    latencies = []
+    for question in questions:
+        started = time.perf_counter()
+        await runner.ainvoke({"messages": [HumanMessage(content=question)]})
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        "mean_s": sum(latencies) / len(latencies),
+        "p95_s": latencies[int(0.95 * (len(latencies) - 1))],
+        "llm_calls_per_question": llm.calls / len(questions),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per stubbed model call")
+    args = parser.parse_args()
+
+    llm = StubLLM(latency=args.llm_latency)
+    db = SQLDatabase.from_uri("sqlite:///Database/retail.db")
+    sql_tool = QuerySQLDatabaseTool(db=db)
+    schema_tool = create_retriever_tool(StubRetriever(), "schema_search", "Find schema information.")
+    agent = create_agent(llm, [schema_tool, sql_tool], system_prompt="You are SQL Query Buddy.")
+    pipeline = QueryPipeline(llm, StubRetriever(), sql_tool, agent)
+
+    questions = [f"What are total sales per product category? ({i})" for i in range(args.questions)]
+    results = {
+        "agent": await run_mode(agent, llm, questions),
+        "pipeline": await run_mode(pipeline, llm, questions),
+    }
+
+    print(f"{'mode':<10}{'mean (s)':>10}{'p95 (s)':>10}{'LLM calls/question':>22}")
+    for mode, result in results.items():
+        print(f"{mode:<10}{result['mean_s']:>10.3f}{result['p95_s']:>10.3f}{result['llm_calls_per_question']:>22.1f}")
+    speedup = results["agent"]["mean_s"] / results["pipeline"]["mean_s"]
+    print(f"\nPipeline mode is {speedup:.2f}x faster per question with a {args.llm_latency}s model latency.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
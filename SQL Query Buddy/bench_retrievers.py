@@ -0,0 +1,110 @@
+"""Compares schema retrievers on recall of the tables a question needs and on lookup latency.
+
+BM25 always runs. FAISS and the hybrid retriever are added when the 'faiss_index' folder
+exists, the configured EMBEDDING_PROVIDER can run (OPENAI_API_KEY is set for "openai"),
+since every FAISS lookup embeds the question first, and its vectors have the index's size.
+
+    python bench_retrievers.py --k 4 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import re
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+import config
+from embedding_providers import create_embeddings
+from lexical_retriever import BM25SchemaRetriever, HybridSchemaRetriever
+from schema_docs import load_schema_docs
+
+# Question -> tables the SQL for it has to touch.
+QUESTIONS = {
+    "Who are the top 5 customers by total purchase amount?": {"customers", "orders"},
+    "What is the total sales revenue per product category?": {"products", "order_items"},
+    "Which region has the highest revenue?": {"customers", "orders"},
+    "How many orders were placed each month?": {"orders"},
+    "List the top 10 products by units sold": {"products", "order_items"},
+    "How many customers signed up this year?": {"customers"},
+    "What did customer Alice buy in her last order?": {"customers", "orders", "order_items", "products"},
+    "Average order value in California": {"customers", "orders"},
+    "Which electronics products are the most expensive?": {"products"},
+    "Show the quantity of each item in order 42": {"order_items", "products"},
+    "Which clients spent the most on furniture?": {"customers", "orders", "order_items", "products"},
+    "What is the average price per category?": {"products"},
+}
+
+TABLES = {"customers", "orders", "order_items", "products"}
+
+
+def tables_in(docs):
+    found = set()
+    for doc in docs:
+        found.update(TABLES & set(re.findall(r"[a-z_]+", doc.page_content.lower())))
+    return found
+
+
+async def evaluate(retriever, repeat):
+    recalls, latencies = [], []
+    for question, expected in QUESTIONS.items():
+        docs = await retriever.ainvoke(question)
+        recalls.append(len(expected & tables_in(docs)) / len(expected))
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await retriever.ainvoke(question)
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        "recall": sum(recalls) / len(recalls),
+        "mean_ms": 1000 * sum(latencies) / len(latencies),
+        "p95_ms": 1000 * latencies[int(0.95 * (len(latencies) - 1))],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20, help="timed lookups per question")
+    parser.add_argument("--db", default="Database/retail.db")
+    parser.add_argument("--docs", default="both", choices=["curated", "introspect", "both"])
+    args = parser.parse_args()
+
+    load_dotenv()
+    docs = load_schema_docs(args.docs, create_engine(f"sqlite:///{args.db}"))
+    bm25 = BM25SchemaRetriever.from_documents(docs, k=args.k)
+    retrievers = {"bm25": bm25}
+
+    remote = config.EMBEDDING_PROVIDER == "openai"
+    if os.path.isdir("faiss_index") and (os.getenv("OPENAI_API_KEY") or not remote):
+        from langchain_community.vectorstores import FAISS
+
+        # No vector cache, so every timed lookup pays for its embedding.
+        embedding = create_embeddings(config.EMBEDDING_PROVIDER, config.EMBEDDING_MODEL, dim=config.EMBEDDING_DIM, cache_size=0)
+        vectorstore = FAISS.load_local("faiss_index", embedding, allow_dangerous_deserialization=True)
+        query_dim = len(embedding.embed_query("schema"))
+        if query_dim == vectorstore.index.d:
+            faiss = vectorstore.as_retriever(search_kwargs={"k": args.k})
+            retrievers["faiss"] = faiss
+            retrievers["hybrid"] = HybridSchemaRetriever(lexical=bm25, vector=faiss, k=args.k)
+        else:
+            print(
+                f"'faiss_index' holds {vectorstore.index.d}-dimensional vectors but {config.EMBEDDING_PROVIDER} embeddings "
+                f"have {query_dim}; re-run 'create_rag_index.py'. Benchmarking BM25 only.\n"
+            )
+        # Embedding API calls are slow and billed, so network-bound retrievers get fewer timed runs.
+        vector_repeat = 1 if remote else args.repeat
+        repeats = {"bm25": args.repeat, "faiss": vector_repeat, "hybrid": vector_repeat}
+    else:
+        print("OPENAI_API_KEY or 'faiss_index' missing, benchmarking BM25 only.\n")
+        repeats = {"bm25": args.repeat}
+
+    print(f"{'retriever':<10}{f'recall@{args.k}':>10}{'mean (ms)':>12}{'p95 (ms)':>12}")
+    for name, retriever in retrievers.items():
+        result = await evaluate(retriever, repeats[name])
+        print(f"{name:<10}{result['recall']:>10.2f}{result['mean_ms']:>12.3f}{result['p95_ms']:>12.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+"""Measures read throughput of the default SQLAlchemy engine against the read-only pooled engine.
+
+A synthetic retail database (same schema as Database/setup_db.py) is created in a
+temporary directory. Each thread count runs the analytics queries below for a fixed
+time; with --writer, a background thread keeps inserting orders meanwhile, which
+shows whether readers get blocked by ingestion. No API key is needed.
+
+    python bench_sqlite.py --orders 200000 --threads 1 2 4 8 --seconds 3 --writer
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+
+from sqlite_engine import create_readonly_engine, enable_wal
+
+QUERIES = [
+    "SELECT p.category, SUM(oi.subtotal) FROM products p JOIN order_items oi ON p.product_id = oi.product_id GROUP BY p.category",
+    "SELECT c.region, SUM(o.total_amount) FROM customers c JOIN orders o ON c.customer_id = o.customer_id GROUP BY c.region",
+    "SELECT strftime('%Y-%m', order_date) AS month, COUNT(*) FROM orders GROUP BY month",
+    "SELECT c.name, SUM(o.total_amount) AS spent FROM customers c JOIN orders o ON c.customer_id = o.customer_id "
+    "GROUP BY c.customer_id ORDER BY spent DESC LIMIT 10",
+]
+
+
+def build_database(path, orders, seed=0):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE customers (customer_id INTEGER PRIMARY KEY, name TEXT NOT NULL, email TEXT UNIQUE, region TEXT, signup_date DATE);
+        CREATE TABLE products (product_id INTEGER PRIMARY KEY, name TEXT NOT NULL, category TEXT, price DECIMAL(10,2));
+        CREATE TABLE orders (order_id INTEGER PRIMARY KEY, customer_id INTEGER, order_date DATE, total_amount DECIMAL(10,2),
+                             FOREIGN KEY (customer_id) REFERENCES customers(customer_id));
+        CREATE TABLE order_items (item_id INTEGER PRIMARY KEY, order_id INTEGER, product_id INTEGER, quantity INTEGER, subtotal DECIMAL(10,2),
+                                  FOREIGN KEY (order_id) REFERENCES orders(order_id), FOREIGN KEY (product_id) REFERENCES products(product_id));
+    """)
+    regions = ["California", "New York", "Texas", "Florida", "Washington"]
+    categories = ["Electronics", "Furniture", "Software", "Office", "Outdoor"]
+    customers = max(orders // 20, 1)
+    conn.executemany("INSERT INTO customers VALUES (?, ?, ?, ?, ?)", (
+        (i, f"Customer {i}", f"c{i}@example.com", rng.choice(regions), f"2023-{rng.randint(1, 12):02d}-01")
+        for i in range(1, customers + 1)
+    ))
+    conn.executemany("INSERT INTO products VALUES (?, ?, ?, ?)", (
+        (i, f"Product {i}", rng.choice(categories), round(rng.uniform(5, 2000), 2)) for i in range(1, 501)
+    ))
+    conn.executemany("INSERT INTO orders VALUES (?, ?, ?, ?)", (
+        (i, rng.randint(1, customers), f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", round(rng.uniform(10, 3000), 2))
+        for i in range(1, orders + 1)
+    ))
+    conn.executemany("INSERT INTO order_items (order_id, product_id, quantity, subtotal) VALUES (?, ?, ?, ?)", (
+        (rng.randint(1, orders), rng.randint(1, 500), q, round(q * rng.uniform(5, 500), 2))
+        for _ in range(orders * 2) for q in [rng.randint(1, 5)]
+    ))
+    conn.commit()
+    conn.close()
+
+
+def writer(path, stop, counts):
+    conn = sqlite3.connect(path, timeout=1)
+    while not stop.is_set():
+        try:
+            conn.execute("INSERT INTO orders (customer_id, order_date, total_amount) VALUES (1, '2024-06-01', 10.0)")
+            conn.commit()
+            counts["writes"] += 1
+        except sqlite3.OperationalError:
+            # "database is locked": the writer had to wait for the readers.
+            conn.rollback()
+            counts["blocked"] += 1
+        time.sleep(0.002)
+    conn.close()
+
+
+def run(engine, threads, seconds):
+    done, errors = [0] * threads, [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def worker(n):
+        while time.perf_counter() < deadline:
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text(QUERIES[done[n] % len(QUERIES)])).fetchall()
+                done[n] += 1
+            except Exception:
+                errors[n] += 1
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return sum(done) / seconds, sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--writer", action="store_true", help="insert orders in the background while reading")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Building a database with {args.orders} orders...")
+        engines = {}
+        for name in ("default", "readonly"):
+            path = os.path.join(directory, f"{name}.db")
+            build_database(path, args.orders)
+            if name == "default":
+                engines[name] = (path, create_engine(f"sqlite:///{path}"))
+            else:
+                enable_wal(path)
+                engines[name] = (path, create_readonly_engine(path, pool_size=max(args.threads)))
+
+        print(f"\n{'engine':<10}{'threads':>8}{'queries/s':>12}{'scaling':>9}{'errors':>8}{'writes/s':>10}{'blocked':>9}")
+        for name, (path, engine) in engines.items():
+            baseline = None
+            for threads in args.threads:
+                stop, counts = threading.Event(), {"writes": 0, "blocked": 0}
+                background = threading.Thread(target=writer, args=(path, stop, counts)) if args.writer else None
+                if background:
+                    background.start()
+                qps, errors = run(engine, threads, args.seconds)
+                stop.set()
+                if background:
+                    background.join()
+                baseline = baseline or qps
+                writes = f"{counts['writes'] / args.seconds:>10.1f}{counts['blocked']:>9}" if args.writer else ""
+                print(f"{name:<10}{threads:>8}{qps:>12.1f}{qps / baseline:>8.2f}x{errors:>8}{writes}")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
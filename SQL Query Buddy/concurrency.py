@@ -0,0 +1,70 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+
+from fastapi import HTTPException
+
+
+class RequestLimiter:
+    """Caps concurrent agent runs per worker and sheds load once the wait queue is full."""
+
+    def __init__(self, max_concurrent, max_queue, retry_after):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    async def acquire(self):
+        # Only count as "waiting" when no slot is immediately free.
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server is busy, please retry shortly.",
+                    headers={"Retry-After": str(self.retry_after)}
+                )
+            self.waiting += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected
+        }
+
+
+def create_executor(max_workers):
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="buddy-worker")
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Runs a synchronous callable on the loop's (bounded) default executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
@@ -0,0 +1,146 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ---Concurrency---
+# How many agent/LLM runs a single uvicorn worker executes at the same time.
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "8"))
+# How many extra requests may wait for a free slot before we answer 503.
+MAX_QUEUE_DEPTH = int(os.getenv("MAX_QUEUE_DEPTH", "32"))
+# Seconds the client is told to wait (Retry-After header) when we are saturated.
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "5"))
+# Threads used for blocking work (sync tools, SQLite calls) off the event loop.
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", str(MAX_CONCURRENT_REQUESTS * 2)))
+
+# ---Sessions---
+# "memory" keeps conversations in the worker process, "sqlite" persists them on disk.
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(24 * 60 * 60)))
+
+# ---History---
+# Number of most recent turns always sent back to the model verbatim.
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "5"))
+# Once the history would exceed this many tokens, older turns are folded into a summary.
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+# Replace the raw rows of earlier answers with a short fingerprint before re-sending them.
+HISTORY_COMPACT_RESULTS = os.getenv("HISTORY_COMPACT_RESULTS", "true").lower() == "true"
+
+# ---Database---
+DB_PATH = os.getenv("DB_PATH", "Database/retail.db")
+# The app only reads: connections are opened read-only and pooled, one per worker thread.
+# WAL lets those readers run alongside each other and alongside ingestion writes. It is a one-off
+# change to the database file (python sqlite_engine.py --wal Database/retail.db); with true, the app
+# also switches DB_PATH at startup, which needs write access to the file and its directory.
+SQLITE_WAL = os.getenv("SQLITE_WAL", "false").lower() == "true"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# ---Query guard---
+# Model-written SQL is stopped after this many seconds (0 disables the deadline).
+SQL_TIMEOUT_SECONDS = float(os.getenv("SQL_TIMEOUT_SECONDS", "10"))
+# A result with more rows than this is returned to the model as an error asking it to aggregate or filter.
+# Up to it, rows are kept server-side and the model only sees SQL_SAMPLE_ROWS of them.
+SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "100000"))
+# Queries whose plan would visit more rows than this (e.g. a cross join of two big tables) are rejected
+# before they run (0 disables the plan check).
+SQL_MAX_SCAN_ROWS = int(os.getenv("SQL_MAX_SCAN_ROWS", "10000000"))
+# Seconds the table sizes behind that estimate are reused before they are measured again.
+SQL_TABLE_ROWS_TTL_SECONDS = float(os.getenv("SQL_TABLE_ROWS_TTL_SECONDS", "60"))
+
+# ---Query results---
+# Rows of a query result the model gets; the full result stays server-side behind a handle
+# and is paged through with GET /results/{handle}.
+SQL_SAMPLE_ROWS = int(os.getenv("SQL_SAMPLE_ROWS", "20"))
+RESULT_STORE_MAX_RESULTS = int(os.getenv("RESULT_STORE_MAX_RESULTS", "200"))
+RESULT_STORE_MAX_ROWS = int(os.getenv("RESULT_STORE_MAX_ROWS", "1000000"))
+RESULT_STORE_TTL_SECONDS = int(os.getenv("RESULT_STORE_TTL_SECONDS", "3600"))
+RESULT_PAGE_MAX_SIZE = int(os.getenv("RESULT_PAGE_MAX_SIZE", "1000"))
+# Rows the server writes into an answer's Raw Results block (the model no longer types them).
+ANSWER_MAX_ROWS = int(os.getenv("ANSWER_MAX_ROWS", "50"))
+# Shares, top contributors, outliers and period-over-period changes computed locally over every row
+# of a result and handed to the model as a fact sheet, so the insight does not depend on the sample.
+INSIGHT_FACTS_ENABLED = os.getenv("INSIGHT_FACTS_ENABLED", "true").lower() == "true"
+INSIGHT_TOP_K = int(os.getenv("INSIGHT_TOP_K", "3"))
+INSIGHT_MAX_FACTS = int(os.getenv("INSIGHT_MAX_FACTS", "12"))
+
+# ---SQL result cache---
+SQL_CACHE_ENABLED = os.getenv("SQL_CACHE_ENABLED", "true").lower() == "true"
+SQL_CACHE_MAX_ENTRIES = int(os.getenv("SQL_CACHE_MAX_ENTRIES", "256"))
+SQL_CACHE_MAX_BYTES = int(os.getenv("SQL_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+# Queries that read the clock (date('now'), CURRENT_DATE) are only reused for this many seconds;
+# queries calling random() are never cached.
+SQL_CACHE_CLOCK_TTL_SECONDS = int(os.getenv("SQL_CACHE_CLOCK_TTL_SECONDS", "60"))
+
+# ---Semantic answer cache---
+# Off by default: embeddings barely separate questions that differ only in a number, year or region, so
+# hits also require those literals to match, but a near-duplicate can still get another question's answer.
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+# Minimum cosine similarity between two questions to reuse an answer.
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "500"))
+# "answer" returns the cached answer, "rerun" re-executes the cached SQL and reuses the answer only if the rows are unchanged.
+SEMANTIC_CACHE_MODE = os.getenv("SEMANTIC_CACHE_MODE", "answer")
+
+# ---Prompt enhancement---
+ENHANCE_CACHE_PATH = os.getenv("ENHANCE_CACHE_PATH", "enhance_cache.db")
+ENHANCE_CACHE_MAX_ENTRIES = int(os.getenv("ENHANCE_CACHE_MAX_ENTRIES", "2000"))
+ENHANCE_CACHE_TTL_SECONDS = int(os.getenv("ENHANCE_CACHE_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+# Answer common prompt shapes with the local rule-based rewriter when it is at least this confident.
+ENHANCE_RULES_ENABLED = os.getenv("ENHANCE_RULES_ENABLED", "true").lower() == "true"
+ENHANCE_RULES_MIN_CONFIDENCE = float(os.getenv("ENHANCE_RULES_MIN_CONFIDENCE", "0.8"))
+
+# ---Template fast path---
+# Answer common question shapes (top customers, sales by category/region, orders by month) with canned SQL.
+TEMPLATE_FAST_PATH_ENABLED = os.getenv("TEMPLATE_FAST_PATH_ENABLED", "true").lower() == "true"
+
+# ---Agent mode---
+# "agent" lets the ReAct agent decide every step; "pipeline" runs retrieve -> SQL -> execute -> answer
+# with two LLM calls and only hands over to the agent when the generated SQL fails.
+AGENT_MODE = os.getenv("AGENT_MODE", "agent")
+
+# ---Schema context---
+# "inline" pins a compact schema summary into the system prompt, "retriever" always uses schema_search,
+# and "auto" inlines the summary when it fits in SCHEMA_INLINE_MAX_TOKENS.
+SCHEMA_MODE = os.getenv("SCHEMA_MODE", "auto")
+SCHEMA_INLINE_MAX_TOKENS = int(os.getenv("SCHEMA_INLINE_MAX_TOKENS", "1500"))
+# Retriever behind schema_search: "bm25" is local and needs no embedding call, "faiss" uses the
+# embedded index from create_rag_index.py, and "hybrid" fuses the two rankings.
+SCHEMA_RETRIEVER = os.getenv("SCHEMA_RETRIEVER", "bm25")
+SCHEMA_RETRIEVER_K = int(os.getenv("SCHEMA_RETRIEVER_K", "4"))
+# Documents behind the retrievers: "curated" (hand-written retail docs), "introspect" (generated from
+# the live database: tables, FK joins, join paths, columns) or "both".
+SCHEMA_DOCS = os.getenv("SCHEMA_DOCS", "both")
+# Documents embedded per request when building the FAISS index.
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+# On-disk format the app loads the embedded index from: "faiss" (faiss_index/, pickled docstore) or
+# "mmap" (schema_index/, memory-mapped vectors and a SQLite docstore, shared between workers).
+SCHEMA_INDEX_FORMAT = os.getenv("SCHEMA_INDEX_FORMAT", "faiss")
+# "float32" keeps exact vectors, "int8" stores them at a quarter of the size.
+SCHEMA_INDEX_DTYPE = os.getenv("SCHEMA_INDEX_DTYPE", "float32")
+# FAISS index type: "auto" picks exact "flat" search for small collections, "hnsw" from
+# INDEX_HNSW_MIN_DOCS documents and the compressed "ivfpq" from INDEX_IVFPQ_MIN_DOCS.
+INDEX_TYPE = os.getenv("INDEX_TYPE", "auto")
+INDEX_HNSW_MIN_DOCS = int(os.getenv("INDEX_HNSW_MIN_DOCS", "5000"))
+INDEX_IVFPQ_MIN_DOCS = int(os.getenv("INDEX_IVFPQ_MIN_DOCS", "100000"))
+
+# ---Embeddings---
+# "openai" calls the API, "hashing" is a local hashing vectorizer (offline, no model download),
+# "sentence-transformers" runs a local model on CPU (pip install sentence-transformers).
+# Changing the provider or model needs a rebuild with create_rag_index.py.
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+# Model name for the provider; empty uses the provider's default.
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL") or None
+# Vector size of the hashing provider.
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "512"))
+# Vectors kept in memory by text, so repeated questions and documents are embedded once.
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+# Concurrent question embeddings wait up to this many milliseconds to be sent as one batched call (0 disables).
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+EMBEDDING_MAX_QUERY_BATCH = int(os.getenv("EMBEDDING_MAX_QUERY_BATCH", "64"))
+# Two-stage lookup: the retriever above only picks tables, and schema_search returns those tables'
+# relevant columns plus the exact join conditions from the foreign-key graph.
+SCHEMA_JOIN_GRAPH = os.getenv("SCHEMA_JOIN_GRAPH", "false").lower() == "true"
+SCHEMA_JOIN_GRAPH_MAX_TABLES = int(os.getenv("SCHEMA_JOIN_GRAPH_MAX_TABLES", "5"))
@@ -1,63 +1,63 @@
 import os
-from langchain_openai import OpenAIEmbeddings
+import numpy as np
 from langchain_community.vectorstores import FAISS
-from langchain_core.documents import Document
 from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+import config
+from schema_docs import load_schema_docs
+from index_builder import VECTORS, build_index, embedding_model_name
+from mmap_index import export_index
+from embedding_providers import create_embeddings
 
 load_dotenv()
 
-if not os.getenv("OPENAI_API_KEY"):
+if config.EMBEDDING_PROVIDER == "openai" and not os.getenv("OPENAI_API_KEY"):
     print("OPENAI_API_KEY not set. Please set it as an environment variable")
     exit()
     
-print("OpenAI API key found. Proceeding with embedding...")
-
-schema_docs = [
-    Document(
-        page_content="The 'customers' table stores information about customers. It includes a unique 'customer_id' (primary key), 'name', 'email', 'region' (e.g., 'California', 'New York'), and 'signup_date'.",
-        metadata={"table_name": "customers"}
-    ),
-    Document(
-        page_content="The 'products' table contains the product catalog. It has a 'product_id' (primary key), 'name' of the product, 'category' (e.g., 'Electronics', 'Furniture', 'Software'), and 'price'.",
-        metadata={"table_name": "products"}
-    ),
-    Document(
-        page_content="The 'orders' table tracks customer purchases. It includes an 'order_id' (primary key), 'customer_id' (a foreign key linking to the 'customers' table), 'order_date', and the 'total_amount' for the order.",
-        metadata={"table_name": "orders"}
-    ),
-    Document(
-        page_content="The 'order_items' table links orders to products, showing what items were in each order. It has an 'item_id' (primary key), 'order_id' (links to 'orders'), 'product_id' (links to 'products'), the 'quantity' of the product ordered, and the 'subtotal' for that line item.",
-        metadata={"table_name": "order_items"}
-    ),
-    Document(
-        page_content="To find a customer's orders, join 'customers' and 'orders' on 'customers.customer_id = orders.customer_id'.",
-        metadata={"join_info": "customers_orders"}
-    ),
-    Document(
-        page_content="To see the products in a specific order, join 'orders' and 'order_items' on 'orders.order_id = order_items.order_id', then join 'order_items' and 'products' on 'order_items.product_id = products.product_id'.",
-        metadata={"join_info": "orders_items_products"}
-    ),
-    Document(
-        page_content="You can calculate total sales for a customer by joining 'customers' and 'orders' on their 'customer_id' and summing the 'total_amount' from the 'orders' table.",
-        metadata={"query_example": "total_sales_per_customer"}
-    ),
-    Document(
-        page_content="To find sales by product category, you must join 'products', 'order_items', and 'orders' tables. Link 'products.product_id' with 'order_items.product_id', and 'order_items.order_id' with 'orders.order_id'. Then, you can group by 'products.category' and sum 'order_items.subtotal'.",
-        metadata={"query_example": "sales_by_category"}
-    )
-]
+print(f"Embedding provider: {config.EMBEDDING_PROVIDER}. Proceeding with embedding...")
 
 try:
-    embedding = OpenAIEmbeddings()
+    embedding = create_embeddings(
+        config.EMBEDDING_PROVIDER,
+        config.EMBEDDING_MODEL,
+        dim=config.EMBEDDING_DIM,
+        batch_size=config.EMBED_BATCH_SIZE,
+        cache_size=config.EMBEDDING_CACHE_SIZE
+    )
+    
+    docs = load_schema_docs(config.SCHEMA_DOCS, create_engine(f"sqlite:///{config.DB_PATH}"))
+    print(f"Indexing {len(docs)} schema documents ({config.SCHEMA_DOCS})... Only new or changed ones are embedded")
     
-    print("Creating FAISS vector store... This may take a moment")
-    vectorstore = FAISS.from_documents(schema_docs, embedding)
+    # Large schemas produce thousands of column docs, so they are embedded in batches.
+    changes = build_index(
+        docs,
+        embedding,
+        "faiss_index",
+        batch_size=config.EMBED_BATCH_SIZE,
+        index_type=config.INDEX_TYPE,
+        hnsw_min_docs=config.INDEX_HNSW_MIN_DOCS,
+        ivfpq_min_docs=config.INDEX_IVFPQ_MIN_DOCS
+    )
+    print(f"{changes['added']} added, {changes['removed']} removed, {changes['unchanged']} unchanged ({changes['index_type']} index)")
     
-    vectorstore.save_local("faiss_index")
+    if config.SCHEMA_INDEX_FORMAT == "mmap":
+        # The FAISS folder stays the build state; the app loads the pickle-free copy.
+        vectorstore = FAISS.load_local("faiss_index", embedding, allow_dangerous_deserialization=True)
+        export_index(
+            vectorstore,
+            "schema_index",
+            dtype=config.SCHEMA_INDEX_DTYPE,
+            embedding_model=embedding_model_name(embedding),
+            vectors=np.load(os.path.join("faiss_index", VECTORS))
+        )
+        print(f"Exported the index to 'schema_index' ({config.SCHEMA_INDEX_DTYPE} vectors)")
     
     print("\nSuccessfully created and saved FAISS index to the 'faiss_index' folder")
     print("This folder now contain your embedded schema descriptions.")
     
 except Exception as e:
     print(f"\nAn error occurred: {e}")
-    print("Please ensure your OPENAI_API_KEY is correct and has a valid subscription.")
\ No newline at end of file
+    if config.EMBEDDING_PROVIDER == "openai":
+        print("Please ensure your OPENAI_API_KEY is correct and has a valid subscription.")
\ No newline at end of file
@@ -0,0 +1,267 @@
+import asyncio
+import hashlib
+import re
+import time
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_words = re.compile(r"[a-z0-9]+(?:_[a-z0-9]+)*")
+
+
+@lru_cache(maxsize=100000)
+def _bucket(feature, dim):
+    digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+    return digest % dim, 1.0 if (digest >> 63) & 1 else -1.0
+
+
+class HashingEmbeddings(Embeddings):
+    """Local, deterministic embeddings from hashed word and character trigram features.
+
+    No model download and no network: a vector costs a few microseconds per word. It
+    matches on shared vocabulary rather than meaning, which suits schema lookups
+    where questions and documents use the same table and column words.
+    """
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.model = f"hashing-{dim}"
+
+    def _features(self, text):
+        for word in _words.findall(text.lower()):
+            parts = [word] + (word.split("_") if "_" in word else [])
+            for part in parts:
+                yield f"w:{part}", 1.0
+                padded = f"<{part}>"
+                for i in range(len(padded) - 2):
+                    yield f"c:{padded[i:i + 3]}", 0.5
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            index, sign = _bucket(feature, self.dim)
+            vector[index] += sign * weight
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text) -> List[float]:
+        return self._embed(text)
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """A local sentence-transformers model on CPU (pip install sentence-transformers)."""
+
+    def __init__(self, model="sentence-transformers/all-MiniLM-L6-v2", batch_size=64):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("sentence-transformers is not installed. Run 'pip install sentence-transformers'")
+        self.model = model
+        self.batch_size = batch_size
+        self._model = SentenceTransformer(model, device="cpu")
+
+    def embed_documents(self, texts) -> List[List[float]]:
+        vectors = self._model.encode(list(texts), batch_size=self.batch_size, normalize_embeddings=True)
+        return vectors.tolist()
+
+    def embed_query(self, text) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps a provider with an LRU cache of vectors by text and sends misses in batches."""
+
+    def __init__(self, provider, max_entries=10000, batch_size=256):
+        self.provider = provider
+        self.model = getattr(provider, "model", None) or type(provider).__name__
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self._vectors = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, texts):
+        found = {}
+        for text in texts:
+            if text in self._vectors:
+                self._vectors.move_to_end(text)
+                found[text] = self._vectors[text]
+        self.hits += sum(1 for text in texts if text in found)
+        missing = list(dict.fromkeys(text for text in texts if text not in found))
+        self.misses += len(missing)
+        return found, missing
+
+    def _remember(self, found, texts, vectors):
+        for text, vector in zip(texts, vectors):
+            found[text] = vector
+            self._vectors[text] = vector
+        while len(self._vectors) > self.max_entries:
+            self._vectors.popitem(last=False)
+
+    def embed_documents(self, texts) -> List[List[float]]:
+        found, missing = self._lookup(texts)
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            self._remember(found, batch, self.provider.embed_documents(batch))
+        return [found[text] for text in texts]
+
+    async def aembed_documents(self, texts) -> List[List[float]]:
+        found, missing = self._lookup(texts)
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            self._remember(found, batch, await self.provider.aembed_documents(batch))
+        return [found[text] for text in texts]
+
+    def embed_query(self, text) -> List[float]:
+        found, missing = self._lookup([text])
+        if missing:
+            self._remember(found, missing, [self.provider.embed_query(text)])
+        return found[text]
+
+    async def aembed_query(self, text) -> List[float]:
+        found, missing = self._lookup([text])
+        if missing:
+            self._remember(found, missing, [await self.provider.aembed_query(text)])
+        return found[text]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model,
+            "entries": len(self._vectors),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "batching": self.provider.stats() if isinstance(self.provider, BatchingEmbeddings) else None
+        }
+
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+WAIT_MS_BUCKETS = [1, 2, 5, 10, 20, 50]
+
+
+def _histogram_label(value, bounds):
+    for bound in bounds:
+        if value <= bound:
+            return f"<={bound}"
+    return f">{bounds[-1]}"
+
+
+class BatchingEmbeddings(Embeddings):
+    """Collects concurrent aembed_query() calls for up to `wait_ms` and embeds them in one request.
+
+    A batch is sent when the first query in it has waited `wait_ms` or when `max_batch`
+    queries are queued, whichever comes first. Every caller gets back its own vector
+    (or the batch's error). Sync calls go straight to the provider.
+    """
+
+    def __init__(self, provider, wait_ms=5, max_batch=64):
+        self.provider = provider
+        self.model = getattr(provider, "model", None) or type(provider).__name__
+        self.wait_ms = wait_ms
+        self.max_batch = max_batch
+        self._loop = None
+        self._pending = []
+        self._timer = None
+        # The loop only keeps weak references to tasks, so hold on to in-flight batches.
+        self._tasks = set()
+        self.batches = 0
+        self.queries = 0
+        self.batch_sizes = Counter()
+        self.wait_times = Counter()
+
+    def embed_documents(self, texts) -> List[List[float]]:
+        return self.provider.embed_documents(texts)
+
+    def embed_query(self, text) -> List[float]:
+        return self.provider.embed_query(text)
+
+    async def aembed_documents(self, texts) -> List[List[float]]:
+        return await self.provider.aembed_documents(texts)
+
+    async def aembed_query(self, text) -> List[float]:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Queued work belongs to the loop that created it.
+            self._loop, self._pending, self._timer = loop, [], None
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.wait_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch):
+        sent_at = time.perf_counter()
+        self.batches += 1
+        self.queries += len(batch)
+        self.batch_sizes[_histogram_label(len(batch), BATCH_SIZE_BUCKETS)] += 1
+        for _, _, queued_at in batch:
+            self.wait_times[_histogram_label((sent_at - queued_at) * 1000, WAIT_MS_BUCKETS)] += 1
+
+        try:
+            vectors = await self.provider.aembed_documents([text for text, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), vector in zip(batch, vectors):
+            # A caller may have gone away (e.g. the client disconnected) and cancelled its future.
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self):
+        return {
+            "wait_ms": self.wait_ms,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "queries": self.queries,
+            "mean_batch_size": round(self.queries / self.batches, 2) if self.batches else 0.0,
+            "batch_size_histogram": {label: self.batch_sizes[label] for label in self._labels(BATCH_SIZE_BUCKETS)},
+            "wait_ms_histogram": {label: self.wait_times[label] for label in self._labels(WAIT_MS_BUCKETS)}
+        }
+
+    @staticmethod
+    def _labels(bounds):
+        return [f"<={bound}" for bound in bounds] + [f">{bounds[-1]}"]
+
+
+def create_embeddings(provider="openai", model=None, dim=512, batch_size=256, cache_size=10000,
+                      batch_wait_ms=0, max_query_batch=64):
+    """Embedding provider by name ("openai", "hashing" or "sentence-transformers"), with a vector cache.
+
+    With batch_wait_ms > 0, concurrent query embeddings are micro-batched into one call.
+    """
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        base = OpenAIEmbeddings(model=model, chunk_size=batch_size) if model else OpenAIEmbeddings(chunk_size=batch_size)
+    elif provider == "hashing":
+        base = HashingEmbeddings(dim=dim)
+    elif provider == "sentence-transformers":
+        base = SentenceTransformerEmbeddings(model, batch_size=batch_size) if model else SentenceTransformerEmbeddings(batch_size=batch_size)
+    else:
+        raise ValueError(f"Unknown embedding provider '{provider}', expected openai, hashing or sentence-transformers.")
+    # Hashing costs microseconds per text, so waiting to batch would only add latency.
+    if batch_wait_ms > 0 and provider != "hashing":
+        base = BatchingEmbeddings(base, wait_ms=batch_wait_ms, max_batch=max_query_batch)
+    if cache_size <= 0:
+        return base
+    return CachedEmbeddings(base, max_entries=cache_size, batch_size=batch_size)
@@ -9,6 +9,7 @@ function App() {
   const [input, setInput] = useState("");
   const [loading, setLoading] = useState(false);
   const [chatLoading, setChatLoading] = useState(false)
+  const [sessionId, setSessionId] = useState(null);
 
   const API_URL = "http://localhost:8000/chat";
 
@@ -50,34 +51,73 @@ function App() {
     setInput("");
     setChatLoading(true);
 
-    const simpleHistory = messages
-      .filter((m) => m.sender === "ai")
-      .map((m, i) => {
-        const userMsg = messages.filter((m) => m.sender === "user")[i];
-        return [userMsg ? userMsg.text : "", m.text];
-      })
-      .slice(-5);
-
     try {
-      const response = await fetch(API_URL, {
+      const response = await fetch(`${API_URL}/stream`, {
         method: "POST",
         headers: { "Content-type": "application/json" },
+        // The server keeps the conversation; only the new question is sent.
         body: JSON.stringify({
           question: sanitizedInput,
-          chat_history: simpleHistory,
+          session_id: sessionId,
         }),
       });
 
       if (!response.ok) {
         const errorData = await response.json();
         console.error("Server error:", errorData);
+        // The session expired on the server, start a fresh one on the next message.
+        if (response.status === 404) setSessionId(null);
         throw new Error(`Server error: ${response.status}`);
       }
 
-      const data = await response.json();
-      const aiMessage = { sender: "ai", text: data.answer };
+      // Render the answer progressively as Server-Sent Events arrive.
+      setMessages((prev) => [...prev, { sender: "ai", text: "" }]);
+      const updateAIMessage = (update) =>
+        setMessages((prev) => {
+          const last = prev[prev.length - 1];
+          return [...prev.slice(0, -1), { ...last, ...update(last) }];
+        });
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
 
-      setMessages((prev) => [...prev, aiMessage]);
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+
+        for (const rawEvent of events) {
+          const eventLine = rawEvent.match(/^event: (.*)$/m);
+          const dataLine = rawEvent.match(/^data: (.*)$/m);
+          if (!eventLine || !dataLine) continue;
+          const data = JSON.parse(dataLine[1]);
+
+          switch (eventLine[1]) {
+            case "tool_start":
+              updateAIMessage(() => ({
+                status: data.tool === "schema_search" ? "Searching schema..." : "Running SQL query...",
+              }));
+              break;
+            case "token":
+              setChatLoading(false);
+              updateAIMessage((last) => ({ text: last.text + data.text, status: null }));
+              break;
+            case "done":
+              setSessionId(data.session_id);
+              updateAIMessage(() => ({ text: data.answer, status: null }));
+              break;
+            case "error":
+              updateAIMessage(() => ({ text: data.message, status: null }));
+              break;
+            default:
+              break;
+          }
+        }
+      }
     } catch (error) {
       console.error("Error fetching from API:", error);
       const errorMessage = {
@@ -104,7 +144,10 @@ function App() {
         </p>
 
         <button
-          onClick={() => setMessages([])}
+          onClick={() => {
+            setMessages([]);
+            setSessionId(null);
+          }}
           className="absolute top-5 right-6 text-white text-2xl transition-all duration-300 hover:text-neutral-400 hover:cursor-pointer py-3 px-3 rounded-full"
           title="New Chat"
         >
@@ -152,7 +195,12 @@ function App() {
                 {msg.sender === "user" ? (
                   <p>{msg.text}</p>
                 ) : (
-                  <AIMessage content={msg.text} />
+                  <>
+                    {msg.status && (
+                      <p className="text-sm text-neutral-400 italic">{msg.status}</p>
+                    )}
+                    <AIMessage content={msg.text} />
+                  </>
                 )}
               </div>
             </div>
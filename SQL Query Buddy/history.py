@@ -0,0 +1,260 @@
+import ast
+import json
+import re
+from contextvars import ContextVar
+from functools import lru_cache
+
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+
+from answer_format import NO_ROWS, shown_row_total
+from result_store import sample_payload
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _encoding = None
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text):
+    if _encoding is None:
+        # Rough fallback when tiktoken is unavailable: ~4 characters per token.
+        return len(text) // 4 + 1
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def turns_tokens(turns):
+    return sum(count_tokens(human) + count_tokens(ai) for human, ai in turns)
+
+
+summary_prompt = """
+You maintain a running summary of a conversation between a user and 'SQL Query Buddy',
+an assistant that answers questions about a retail database with SQL.
+
+Update the existing summary with the new turns below. Keep it short (at most ~200 words) and keep
+what a follow-up question could depend on: the questions asked, tables/filters/timeframes used,
+key numbers and conclusions, and any follow-up the assistant offered last.
+Return ONLY the updated summary.
+
+Existing summary:
+{summary}
+
+New turns:
+{turns}
+"""
+
+
+# Turns of the conversation being answered, so tools can reach rows that were
+# compacted out of the history.
+current_turns = ContextVar("current_turns", default=[])
+
+_sql_block = re.compile(r"```sql\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+_raw_block = re.compile(r"\*\*Raw Results:\*\*\s*```[a-z]*\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+_insight = re.compile(r"\*\*AI-Driven Insight:\*\*", re.IGNORECASE)
+_handle = re.compile(r"/results/(r_[0-9a-f]+)")
+
+
+def extract_sql(answer):
+    match = _sql_block.search(answer)
+    return match.group(1).strip() if match else None
+
+
+def extract_raw_results(answer):
+    match = _raw_block.search(answer)
+    return match.group(1).strip() if match else None
+
+
+def _select_columns(sql):
+    match = re.search(r"^\s*(?:with\b.*?\)\s*)?select\s+(?:distinct\s+)?(.*?)\s+from\s", sql or "", re.DOTALL | re.IGNORECASE)
+    if not match:
+        return []
+    columns, depth, current = [], 0, ""
+    for char in match.group(1):
+        depth += char == "("
+        depth -= char == ")"
+        if char == "," and depth == 0:
+            columns.append(current)
+            current = ""
+        else:
+            current += char
+    columns.append(current)
+    # Prefer the alias, otherwise the bare column name.
+    return [re.split(r"\s+as\s+|\s+|\.", c.strip(), flags=re.IGNORECASE)[-1].strip('"`[]') for c in columns if c.strip()]
+
+
+def _count_rows(raw):
+    if raw == NO_ROWS:
+        return 0, None
+    if raw.startswith("{"):
+        # Structured SQL tool output copied as is.
+        try:
+            payload = json.loads(raw)
+            return payload["row_count"], len(payload["columns"])
+        except (ValueError, KeyError, TypeError):
+            pass
+    if raw.startswith("["):
+        try:
+            rows = ast.literal_eval(raw)
+            return len(rows), len(rows[0]) if rows and isinstance(rows[0], tuple) else None
+        except (ValueError, SyntaxError):
+            return raw.count("),") + 1, None
+    lines = [line for line in raw.splitlines() if line.strip()]
+    if lines and lines[0].lstrip().startswith("|"):
+        # Markdown table: drop the header and separator lines. A server-rendered table cut to
+        # a sample ends with a line giving the full count.
+        table = [line for line in lines if line.lstrip().startswith("|")]
+        rows = shown_row_total(raw)
+        return rows if rows is not None else max(len(table) - 2, 0), table[0].strip().strip("|").count("|") + 1
+    return len(lines), None
+
+
+def results_fingerprint(raw, sql):
+    rows, width = _count_rows(raw)
+    columns = _select_columns(sql)
+    if columns and "*" not in columns:
+        column_text = ", ".join(columns)
+    else:
+        column_text = f"{width} columns" if width else "unknown columns"
+    return f"{rows} row{'s' if rows != 1 else ''}; columns: {column_text}"
+
+
+def compact_answer(answer, turn_number):
+    """Keeps only the SQL and the insight (plus follow-up) of an earlier answer.
+
+    The raw rows are replaced by a row-count/column fingerprint; the full rows stay
+    in the session and can be fetched again with the 'previous_results' tool.
+    """
+    raw = extract_raw_results(answer)
+    insight = _insight.search(answer)
+    if raw is None or insight is None:
+        return answer
+
+    sql = extract_sql(answer)
+    parts = []
+    if sql:
+        parts.append(f"**SQL:**\n```sql\n{sql}\n```")
+    parts.append(
+        f"**Raw Results:** [{results_fingerprint(raw, sql)}; "
+        f"omitted here, use previous_results with turn={turn_number} for the rows]"
+    )
+    parts.append(answer[insight.start():].strip())
+    return "\n\n".join(parts)
+
+
+def get_previous_results(turn, results=None, sample_rows=20, offset=0):
+    """The rows of an earlier turn, `sample_rows` at a time from `offset`.
+
+    The turn's result is looked up in `results` (a ResultStore) by the handle in its
+    answer, or else by its SQL, and returned in the same sampled form as a fresh query.
+    Once it has expired there, the first rows of the answer's Raw Results block are returned.
+    """
+    turns = current_turns.get()
+    if not 1 <= turn <= len(turns):
+        return f"Error: there is no turn {turn}. This conversation has {len(turns)} earlier turns."
+    answer = turns[turn - 1][1]
+    raw = extract_raw_results(answer)
+    if raw is None:
+        return f"Turn {turn} did not include raw results."
+
+    if results is not None:
+        handle = _handle.search(raw)
+        sql = extract_sql(answer)
+        entry = results.get(handle.group(1)) if handle else None
+        if entry is None and sql:
+            entry = results.latest(sql)
+        if entry is not None:
+            return sample_payload(entry, sample_rows, offset=offset)
+
+    lines = raw.splitlines()
+    if not lines[0].lstrip().startswith("|"):
+        return raw
+    # Header and separator, then the requested rows of the rendered table.
+    table = [line for line in lines if line.lstrip().startswith("|")]
+    body = table[2:]
+    shown = body[offset:offset + sample_rows]
+    total = shown_row_total(raw) or len(body)
+    note = f"(rows {offset + 1} to {offset + len(shown)} of {total:,}"
+    if total > len(body):
+        note += f"; the stored result has expired, so rows past {len(body)} are no longer available"
+    return "\n".join(table[:2] + shown + [note + ")"])
+
+
+class HistoryManager:
+    """Keeps the last N turns verbatim and folds older ones into a rolling summary.
+
+    The summary is only refreshed when the history that would be sent exceeds
+    the token budget, and then only the turns not yet summarized are folded in.
+    Sessionless requests (session_id None) have nowhere to keep a summary, so
+    over the budget they only get the last N turns.
+    """
+
+    def __init__(self, llm, keep_turns=5, token_budget=3000, compact_results=True):
+        self.llm = llm
+        self.keep_turns = keep_turns
+        self.token_budget = token_budget
+        self.compact_results = compact_results
+        self.summaries_created = 0
+        self.tokens_saved_total = 0
+
+    async def prepare(self, session, question):
+        """Returns (messages, tokens_saved, summary_changed) for the next agent run."""
+        current_turns.set(session.turns)
+        turns = self._compacted(session.turns)
+        pending = turns[session.summarized_turns:]
+        summary_changed = False
+
+        history_tokens = count_tokens(session.summary) + turns_tokens(pending)
+        split = len(turns) - self.keep_turns
+        if session.session_id is None:
+            # Summarizing here would cost an LLM call on every request of the conversation.
+            if history_tokens > self.token_budget and split > 0:
+                pending = turns[split:]
+        elif history_tokens > self.token_budget and split > session.summarized_turns:
+            to_fold = turns[session.summarized_turns:split]
+            session.summary = await self._summarize(session.summary, to_fold)
+            session.summarized_turns = split
+            pending = turns[split:]
+            summary_changed = True
+            self.summaries_created += 1
+
+        messages = build_history_messages(pending, question, summary=session.summary)
+        sent_tokens = count_tokens(session.summary) + turns_tokens(pending)
+        tokens_saved = max(turns_tokens(session.turns) - sent_tokens, 0)
+        self.tokens_saved_total += tokens_saved
+        return messages, tokens_saved, summary_changed
+
+    def _compacted(self, turns):
+        if not self.compact_results:
+            return turns
+        return [(human, compact_answer(ai, number)) for number, (human, ai) in enumerate(turns, start=1)]
+
+    async def _summarize(self, summary, turns):
+        rendered = "\n\n".join(f"User: {human}\nAssistant: {ai}" for human, ai in turns)
+        response = await self.llm.ainvoke([
+            HumanMessage(content=summary_prompt.format(summary=summary or "(none yet)", turns=rendered))
+        ])
+        return response.content.strip()
+
+    def stats(self):
+        return {
+            "keep_turns": self.keep_turns,
+            "token_budget": self.token_budget,
+            "summaries_created": self.summaries_created,
+            "tokens_saved_total": self.tokens_saved_total
+        }
+
+
+def build_history_messages(turns, question, summary=""):
+    history_messages = []
+    if summary:
+        history_messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+
+    for item in turns:
+        if isinstance(item, (list, tuple)) and len(item) == 2:
+            human, ai = item
+            history_messages.append(HumanMessage(content=human))
+            history_messages.append(AIMessage(content=ai))
+
+    history_messages.append(HumanMessage(content=question))
+    return history_messages
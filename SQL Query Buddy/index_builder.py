@@ -0,0 +1,157 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+MANIFEST = "manifest.json"
+# Raw float32 vectors in manifest["documents"] order. They let the index be rebuilt
+# (in any index type) without embedding anything that has not changed.
+VECTORS = "embeddings.npy"
+
+
+def doc_id(doc):
+    """Content hash of a document (text and metadata), used as its id in the index."""
+    payload = json.dumps({"content": doc.page_content, "metadata": doc.metadata}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def embedding_model_name(embedding):
+    return getattr(embedding, "model", None) or type(embedding).__name__
+
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_cached_vectors(path, model=None):
+    """{doc id: vector} from the last build, or {} when there is none or it used another embedding model."""
+    manifest = read_manifest(path)
+    if manifest is None or (model is not None and manifest.get("embedding_model") != model):
+        return {}
+    try:
+        vectors = np.load(os.path.join(path, VECTORS))
+    except (OSError, ValueError):
+        return {}
+    if len(vectors) != len(manifest["documents"]):
+        return {}
+    return dict(zip(manifest["documents"], vectors))
+
+
+def choose_index_type(count, index_type="auto", hnsw_min_docs=5000, ivfpq_min_docs=100000):
+    """Exact search while it is cheap, HNSW for mid-sized collections, IVF-PQ once memory matters."""
+    if index_type != "auto":
+        return index_type
+    if count >= ivfpq_min_docs:
+        return "ivfpq"
+    if count >= hnsw_min_docs:
+        return "hnsw"
+    return "flat"
+
+
+def make_index(index_type, vectors, hnsw_m=32, ef_search=64, nprobe=16, pq_m=64):
+    """A FAISS index of the given type (flat, hnsw or ivfpq) holding `vectors`, trained if needed."""
+    count, dim = vectors.shape
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = max(2 * hnsw_m, ef_search)
+        index.hnsw.efSearch = ef_search
+    elif index_type == "ivfpq":
+        # About 4 * sqrt(n) lists, with at least 39 training points per centroid.
+        nlist = max(1, min(int(4 * math.sqrt(count)), count // 39))
+        # The largest sub-quantizer count up to pq_m that divides dim; each code is m bytes at 8 bits.
+        m = max(q for q in range(1, min(pq_m, dim) + 1) if dim % q == 0)
+        nbits = 8 if count >= 39 * 256 else max(1, int(math.log2(max(count // 39, 2))))
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, nlist, m, nbits)
+        index.train(vectors)
+        index.nprobe = min(nprobe, nlist)
+    else:
+        raise ValueError(f"Unknown index type '{index_type}', expected auto, flat, hnsw or ivfpq.")
+    index.add(vectors)
+    return index
+
+
+def _save_and_swap(vectorstore, path, manifest, vectors):
+    # Write the complete index next to the old one, then swap directories, so a
+    # reader never loads an index.faiss that does not match its index.pkl. The swap
+    # is two renames: between them `path` briefly does not exist, and a reader
+    # starting in that moment fails to load and has to retry.
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    old_path = f"{path}.old-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    vectorstore.save_local(tmp_path)
+    np.save(os.path.join(tmp_path, VECTORS), vectors)
+    with open(os.path.join(tmp_path, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def build_index(docs, embedding, path="faiss_index", batch_size=256, index_type="auto",
+                hnsw_min_docs=5000, ivfpq_min_docs=100000):
+    """Brings the FAISS index at `path` in line with `docs`, embedding only new or changed documents.
+
+    Returns counts of added, removed and unchanged documents and the index type used.
+    Documents are keyed by doc_id(), so an edited document is a removal plus an addition.
+    """
+    model = embedding_model_name(embedding)
+    wanted = {}
+    for doc in docs:
+        wanted.setdefault(doc_id(doc), doc)
+    if not wanted:
+        raise ValueError("There are no schema documents to index.")
+
+    cached = load_cached_vectors(path, model)
+    manifest = read_manifest(path) or {}
+    added = [i for i in wanted if i not in cached]
+    kind = choose_index_type(len(wanted), index_type, hnsw_min_docs, ivfpq_min_docs)
+    stats = {
+        "added": len(added),
+        "removed": sum(1 for i in cached if i not in wanted),
+        "unchanged": sum(1 for i in cached if i in wanted),
+        "index_type": kind
+    }
+    if not added and not stats["removed"] and manifest.get("index_type") == kind:
+        return stats
+
+    for start in range(0, len(added), batch_size):
+        ids = added[start:start + batch_size]
+        vectors = embedding.embed_documents([wanted[i].page_content for i in ids])
+        cached.update(zip(ids, np.asarray(vectors, dtype=np.float32)))
+        print(f"  {start + len(ids)}/{len(added)} new or changed documents embedded")
+
+    # Rebuilding from cached vectors costs no embedding calls, and it is the only
+    # way to drop documents from index types without remove support (HNSW).
+    ids = sorted(wanted)
+    vectors = np.stack([cached[i] for i in ids]).astype(np.float32)
+    index = make_index(kind, vectors)
+    vectorstore = FAISS(
+        embedding,
+        index,
+        InMemoryDocstore({i: Document(page_content=wanted[i].page_content, metadata=wanted[i].metadata, id=i) for i in ids}),
+        dict(enumerate(ids))
+    )
+
+    _save_and_swap(vectorstore, path, {
+        "embedding_model": model,
+        "index_type": kind,
+        "documents": ids,
+        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }, vectors)
+    return stats
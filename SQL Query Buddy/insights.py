@@ -0,0 +1,195 @@
+import re
+import time
+
+import numpy as np
+
+_period = re.compile(r"^\d{4}(?:-\d{2}(?:-\d{2})?)?(?:[ T].*)?$")
+_period_name = re.compile(r"(?:^|_)(?:date|day|week|month|quarter|year|period)(?:$|_)", re.IGNORECASE)
+
+
+def _num(value):
+    if abs(value) >= 100 or float(value).is_integer():
+        return f"{value:,.0f}"
+    return f"{value:,.2f}"
+
+
+def _pct(value):
+    return f"{value:+.1f}%"
+
+
+def _is_id(name):
+    name = name.lower()
+    return name == "id" or name.endswith("_id")
+
+
+def _as_float(values):
+    try:
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+    except (TypeError, ValueError):
+        return None
+
+
+class InsightEngine:
+    """Computes a short fact sheet over a whole query result, for the model to narrate.
+
+    Everything is vectorized with NumPy over the full rows, and the sheet is capped at
+    `max_facts` lines, so a 100k-row result costs the model as many tokens as a
+    10-row one. Columns get a role from their names and values:
+    - measures: numeric columns that are not keys,
+    - time columns: ISO dates/months (sorted as text), or integer columns named like
+      date/month/year (sorted numerically; year + month together form one period),
+    - a dimension: the first other text column.
+    Facts are shares and top-k contributions per dimension value, robust outliers
+    (median/MAD), and period-over-period deltas along the time column.
+    """
+
+    def __init__(self, top_k=3, max_facts=12, max_measures=2, outlier_z=3.5):
+        self.top_k = top_k
+        self.max_facts = max_facts
+        self.max_measures = max_measures
+        self.outlier_z = outlier_z
+        self.analyzed = 0
+        self.rows_analyzed = 0
+        self.total_ms = 0.0
+
+    def _roles(self, columns, types, data):
+        time_cols, dimension, measures = [], None, []
+        for i, (name, kind) in enumerate(zip(columns, types)):
+            sample = [v for v in data[i][:200] if v is not None]
+            if kind == "integer" and _period_name.search(name):
+                # A year or month number is a period, never something to sum.
+                time_cols.append(i)
+            elif not time_cols and kind == "text" and sample and all(_period.match(str(v)) for v in sample):
+                time_cols.append(i)
+            elif kind == "text" and dimension is None:
+                dimension = i
+            elif kind in ("integer", "real") and not _is_id(name) and len(measures) < self.max_measures:
+                measures.append(i)
+        return time_cols, dimension, measures
+
+    def analyze(self, columns, types, rows):
+        """A list of fact strings (empty when the result has nothing to measure)."""
+        started = time.perf_counter()
+        facts = []
+        if rows and columns:
+            data = [list(column) for column in zip(*rows)]
+            time_cols, dimension, measures = self._roles(columns, types, data)
+            periods = list(zip(*(data[i] for i in time_cols))) if time_cols else None
+            for m in measures:
+                values = _as_float(data[m])
+                # A single value (e.g. a COUNT(*)) is already the whole answer.
+                if values is None or np.count_nonzero(~np.isnan(values)) < 2:
+                    continue
+                name = columns[m]
+                facts += self._summary(name, values)
+                if dimension is not None:
+                    facts += self._contributions(columns[dimension], data[dimension], name, values)
+                if periods is not None:
+                    facts += self._periods(periods, name, values)
+        self.analyzed += 1
+        self.rows_analyzed += len(rows)
+        self.total_ms += (time.perf_counter() - started) * 1000
+        return facts[:self.max_facts]
+
+    def _summary(self, name, values):
+        valid = values[~np.isnan(values)]
+        return [
+            f"{name}: total {_num(valid.sum())}, mean {_num(valid.mean())}, median {_num(np.median(valid))}, "
+            f"min {_num(valid.min())}, max {_num(valid.max())} over {len(valid):,} rows"
+        ]
+
+    def _grouped(self, labels, values):
+        # NULL measures are left out rather than counted as 0; a group with only NULLs disappears.
+        valid = ~np.isnan(values)
+        labels = ["NULL" if v is None else str(v) for v, keep in zip(labels, valid) if keep]
+        if not labels:
+            return np.array([]), np.array([])
+        keys, inverse = np.unique(np.array(labels), return_inverse=True)
+        totals = np.bincount(inverse, weights=values[valid])
+        return keys, totals
+
+    def _contributions(self, dimension, labels, name, values):
+        keys, totals = self._grouped(labels, values)
+        facts = []
+        order = np.argsort(totals)[::-1]
+        grand = totals.sum()
+        if (totals >= 0).all() and grand > 0 and len(keys) > 1:
+            top = order[:self.top_k]
+            shares = ", ".join(f"{keys[i]} {100 * totals[i] / grand:.1f}% ({_num(totals[i])})" for i in top)
+            facts.append(
+                f"Top {len(top)} of {len(keys):,} {dimension} by {name}: {shares}; "
+                f"together {100 * totals[top].sum() / grand:.1f}% of the total"
+            )
+            if len(keys) > self.top_k:
+                last = order[-1]
+                facts.append(f"Smallest {dimension} by {name}: {keys[last]} {100 * totals[last] / grand:.1f}%")
+
+        # Robust z-score: distance from the median in units of the (scaled) median absolute deviation.
+        median = np.median(totals)
+        mad = 1.4826 * np.median(np.abs(totals - median))
+        if len(keys) >= 5 and mad > 0:
+            z = (totals - median) / mad
+            outliers = np.flatnonzero(np.abs(z) > self.outlier_z)
+            if len(outliers):
+                worst = outliers[np.argsort(-np.abs(z[outliers]))][:self.top_k]
+                listed = ", ".join(f"{keys[i]} ({_num(totals[i])}, {z[i]:+.1f} MAD)" for i in worst)
+                facts.append(f"{len(outliers)} outlier {dimension} by {name} (median {_num(median)}): {listed}")
+        return facts
+
+    def _period_groups(self, labels, values):
+        """Totals per period in time order; labels are tuples of the time columns' values."""
+        # Rows without a period or without a value are left out of the timeline.
+        dated = np.array([None not in label for label in labels], dtype=bool) & ~np.isnan(values)
+        labels, values = [label for label, keep in zip(labels, dated) if keep], values[dated]
+        if not labels:
+            return np.array([]), np.array([])
+        if all(isinstance(part, (int, float)) and not isinstance(part, bool) for label in labels for part in label):
+            # Month/week/day numbers: sorted as numbers, not as text (1, 2, ..., 10 rather than 1, 10, 2).
+            keys, inverse = np.unique(np.array(labels, dtype=float), axis=0, return_inverse=True)
+            names = np.array([
+                "-".join(str(int(part)).zfill(2 if i else 1) if part.is_integer() else f"{part:g}" for i, part in enumerate(key))
+                for key in keys
+            ])
+            totals = np.bincount(inverse.reshape(-1), weights=values, minlength=len(keys))
+            return names, totals
+        # ISO dates and months sort correctly as text.
+        return self._grouped(["-".join(str(part) for part in label) for label in labels], values)
+
+    def _periods(self, labels, name, values):
+        periods, totals = self._period_groups(labels, values)
+        if len(periods) < 2:
+            return []
+        facts = []
+        previous, current = totals[-2], totals[-1]
+        if previous:
+            facts.append(
+                f"{name} in {periods[-1]}: {_num(current)}, {_pct(100 * (current - previous) / abs(previous))} "
+                f"vs {periods[-2]} ({_num(previous)})"
+            )
+        if totals[0]:
+            facts.append(
+                f"{name} from {periods[0]} to {periods[-1]}: {_pct(100 * (totals[-1] - totals[0]) / abs(totals[0]))} "
+                f"({_num(totals[0])} -> {_num(totals[-1])})"
+            )
+        before = totals[:-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = np.where(before != 0, (totals[1:] - before) / np.abs(before) * 100, np.nan)
+        if len(periods) > 2 and not np.isnan(change).all():
+            up, down = np.nanargmax(change), np.nanargmin(change)
+            moves = []
+            if change[up] > 0:
+                moves.append(f"Largest rise in {name}: {periods[up + 1]} ({_pct(change[up])})")
+            if change[down] < 0:
+                moves.append(f"{'largest' if moves else 'Largest'} drop in {name}: {periods[down + 1]} ({_pct(change[down])})")
+            if moves:
+                facts.append("; ".join(moves))
+        peak = int(np.argmax(totals))
+        facts.append(f"Peak {name}: {periods[peak]} ({_num(totals[peak])}) across {len(periods)} periods")
+        return facts
+
+    def stats(self):
+        return {
+            "analyzed": self.analyzed,
+            "rows_analyzed": self.rows_analyzed,
+            "mean_ms": round(self.total_ms / self.analyzed, 2) if self.analyzed else 0.0
+        }
@@ -0,0 +1,138 @@
+import re
+from collections import deque
+from typing import Any, List
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from lexical_retriever import tokenize
+from schema_summary import format_table, join_edges
+
+
+class JoinGraph:
+    """The foreign-key graph of a schema, with the join condition on every edge."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.neighbours = {table: {} for table in schema}
+        self.fk_targets = {}
+        for table, column, ref_table, ref_column in join_edges(schema):
+            condition = f"{table}.{column} = {ref_table}.{ref_column}"
+            self.neighbours[table][ref_table] = (condition, column, ref_column)
+            self.neighbours[ref_table][table] = (condition, ref_column, column)
+            self.fk_targets[(table, column)] = f"{ref_table}.{ref_column}"
+
+    def _path_to_tree(self, tree, target):
+        """Shortest path (as a list of tables) from any table in `tree` to `target`, or None."""
+        previous = {table: None for table in tree}
+        queue = deque(tree)
+        while queue:
+            table = queue.popleft()
+            if table == target:
+                path = []
+                while table is not None:
+                    path.append(table)
+                    table = previous[table]
+                return path[::-1]
+            for neighbour in self.neighbours[table]:
+                if neighbour not in previous:
+                    previous[neighbour] = table
+                    queue.append(neighbour)
+        return None
+
+    def join_tree(self, tables):
+        """Connects `tables` with few joins: each table in turn is attached by its shortest path to the tree so far.
+
+        Returns (tables in the tree, [(table, table, condition, column, column)] join edges).
+        Tables with no FK path to the others are kept without a join.
+        """
+        tree, edges = [], []
+        for table in tables:
+            if table in tree:
+                continue
+            path = self._path_to_tree(tree, table) if tree else None
+            if path is None:
+                tree.append(table)
+                continue
+            for a, b in zip(path, path[1:]):
+                if b not in tree:
+                    tree.append(b)
+                    edges.append((a, b) + self.neighbours[a][b])
+        return tree, edges
+
+
+class JoinGraphRetriever(BaseRetriever):
+    """Two-stage schema lookup: the base retriever picks tables, the FK graph supplies the joins.
+
+    The result is a single document with only the chosen tables, their join and
+    relevant columns, and the exact join conditions, instead of loose prose snippets.
+    """
+
+    base: BaseRetriever
+    graph: Any
+    max_tables: int = 5
+    # Tables scoring below this share of the best table are dropped.
+    min_score: float = 0.25
+
+    def _pick_tables(self, docs):
+        scores, columns = {}, {}
+        for rank, doc in enumerate(docs):
+            weight = 1 / (rank + 1)
+            owner = doc.metadata.get("table_name")
+            if owner in self.graph.schema:
+                scores[owner] = scores.get(owner, 0.0) + weight
+                if doc.metadata.get("column_name"):
+                    columns.setdefault(owner, set()).add(doc.metadata["column_name"])
+            # Prose and join docs name their tables in the text.
+            for table in self.graph.schema:
+                if table != owner and re.search(rf"\b{re.escape(table)}\b", doc.page_content):
+                    scores[table] = scores.get(table, 0.0) + weight / 2
+        if not scores:
+            return [], columns
+        best = max(scores.values())
+        ranked = sorted((t for t in scores if scores[t] >= self.min_score * best), key=scores.get, reverse=True)
+        return ranked[:self.max_tables], columns
+
+    def _relevant_columns(self, table, query_terms, picked, join_columns):
+        info = self.graph.schema[table]
+        keys = {name for name, _, is_pk in info["columns"] if is_pk} | join_columns
+        matched = set(picked)
+        for name, _, _ in info["columns"]:
+            parts = tokenize(name)
+            if parts and (parts[0] in query_terms or parts[-1] in query_terms):
+                matched.add(name)
+        matched -= keys
+        if not matched:
+            # Nothing in the question points at a column, so show the whole table.
+            return None
+        return keys | matched
+
+    def _render(self, query, docs):
+        tables, picked = self._pick_tables(docs)
+        if not tables:
+            return docs
+        tree, edges = self.graph.join_tree(tables)
+
+        join_columns = {table: set() for table in tree}
+        for a, b, _, column_a, column_b in edges:
+            join_columns[a].add(column_a)
+            join_columns[b].add(column_b)
+
+        query_terms = set(tokenize(query, expand=True))
+        lines = ["Tables:"]
+        for table in tree:
+            columns = self._relevant_columns(table, query_terms, picked.get(table, ()), join_columns[table])
+            if columns is None and table not in tables:
+                # A bridge table nothing in the question points at is only there for the join.
+                columns = join_columns[table]
+            lines.append(format_table(table, self.graph.schema[table], self.graph.fk_targets, columns))
+        if edges:
+            lines.append("Joins:")
+            lines += [condition for _, _, condition, _, _ in edges]
+        return [Document(page_content="\n".join(lines), metadata={"kind": "join_tree", "tables": tree})]
+
+    def _get_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        return self._render(query, self.base.invoke(query))
+
+    async def _aget_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        return self._render(query, await self.base.ainvoke(query))
@@ -0,0 +1,141 @@
+import math
+import re
+from collections import Counter
+from typing import Any, List
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+_words = re.compile(r"[a-z0-9_]+")
+
+STOP_WORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "by", "with", "is", "are", "was", "were",
+    "it", "its", "that", "this", "what", "which", "who", "how", "me", "show", "list", "give", "get", "find",
+    "can", "you", "i", "we", "our", "my", "each", "per", "all", "e", "g", "has", "have",
+}
+
+# Business words that never appear in the schema docs, mapped to the words that do.
+SYNONYMS = {
+    "revenue": ["sales", "total_amount", "subtotal"],
+    "income": ["sales", "total_amount"],
+    "earning": ["sales", "total_amount"],
+    "spend": ["total_amount", "purchase"],
+    "spent": ["total_amount", "purchase"],
+    "spending": ["total_amount", "purchase"],
+    "buyer": ["customer"],
+    "client": ["customer"],
+    "shopper": ["customer"],
+    "state": ["region"],
+    "location": ["region"],
+    "item": ["product", "order_item"],
+    "unit": ["quantity"],
+    "sold": ["quantity", "order_item"],
+    "popular": ["quantity", "order_item"],
+    "month": ["order_date"],
+    "monthly": ["order_date"],
+    "year": ["order_date"],
+    "date": ["order_date", "signup_date"],
+    "recent": ["order_date"],
+    "joined": ["signup_date"],
+    "signup": ["signup_date"],
+    "cost": ["price"],
+    "expensive": ["price"],
+}
+
+
+def _stem(word):
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text, expand=False):
+    """Lowercased, lightly stemmed terms; identifiers like order_date also yield 'order' and 'date'."""
+    terms = []
+    for word in _words.findall(text.lower()):
+        parts = [word] + (word.split("_") if "_" in word else [])
+        for part in parts:
+            term = _stem(part)
+            if not term or term in STOP_WORDS:
+                continue
+            terms.append(term)
+            if expand:
+                terms += [_stem(synonym) for synonym in SYNONYMS.get(term, [])]
+    return terms
+
+
+class BM25Index:
+    """Okapi BM25 over a handful of documents, small enough to score every document per query."""
+
+    def __init__(self, docs, k1=1.5, b=0.75):
+        self.docs = list(docs)
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokenize(doc.page_content)) for doc in self.docs]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        frequencies = Counter(term for counts in self.term_counts for term in counts)
+        n = len(self.docs)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in frequencies.items()}
+
+    def scores(self, query):
+        terms = Counter(tokenize(query, expand=True))
+        scores = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            score = 0.0
+            for term in terms:
+                tf = counts.get(term)
+                if tf:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / self.avg_length)
+                    score += self.idf[term] * tf * (self.k1 + 1) / norm
+            scores.append(score)
+        return scores
+
+    def search(self, query, k=4):
+        """Returns [(document, score)] for the k best documents with a positive score."""
+        ranked = sorted(zip(self.docs, self.scores(query)), key=lambda pair: pair[1], reverse=True)
+        return [(doc, score) for doc, score in ranked[:k] if score > 0]
+
+
+class BM25SchemaRetriever(BaseRetriever):
+    """Local lexical schema search: no embedding call, so a lookup takes microseconds."""
+
+    index: Any
+    k: int = 4
+
+    @classmethod
+    def from_documents(cls, docs, k=4):
+        return cls(index=BM25Index(docs), k=k)
+
+    def _get_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        return [doc for doc, _ in self.index.search(query, self.k)]
+
+    async def _aget_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        # Scoring is pure Python and fast, so skip the thread hop the default implementation makes.
+        return self._get_relevant_documents(query)
+
+
+class HybridSchemaRetriever(BaseRetriever):
+    """Fuses BM25 and vector results with reciprocal rank fusion (score = sum of 1 / (rrf_k + rank))."""
+
+    lexical: BaseRetriever
+    vector: BaseRetriever
+    k: int = 4
+    rrf_k: int = 60
+
+    def _fuse(self, *rankings):
+        scores, docs = {}, {}
+        for ranking in rankings:
+            for rank, doc in enumerate(ranking, start=1):
+                docs.setdefault(doc.page_content, doc)
+                scores[doc.page_content] = scores.get(doc.page_content, 0.0) + 1 / (self.rrf_k + rank)
+        best = sorted(scores, key=scores.get, reverse=True)[:self.k]
+        return [docs[content] for content in best]
+
+    def _get_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        return self._fuse(self.lexical.invoke(query), self.vector.invoke(query))
+
+    async def _aget_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        return self._fuse(await self.lexical.ainvoke(query), await self.vector.ainvoke(query))
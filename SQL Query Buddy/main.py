@@ -1,19 +1,50 @@
 import os
+import json
+import hashlib
+from collections import Counter
+import asyncio
+import time
 import uvicorn
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 from langchain_community.vectorstores import FAISS
 from langchain_community.utilities.sql_database import SQLDatabase
-from langchain_community.tools.sql_database.tool import QuerySQLDatabaseTool
-from langchain_core.tools import create_retriever_tool
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.tools import create_retriever_tool, tool
+from langchain_core.messages import HumanMessage
 from langchain.agents import create_agent
 
+import config
+from concurrency import RequestLimiter, create_executor, run_blocking
+from session_store import Session, create_session_store
+from history import HistoryManager, count_tokens, get_previous_results
+from sql_cache import SQLResultCache
+from sql_tools import StructuredQuerySQLDatabaseTool, fetch_rows
+from query_guard import QueryGuard
+from result_store import ResultStore, parse_payload, sample_payload
+from insights import InsightEngine
+from answer_format import build_answer
+from sqlite_engine import create_readonly_engine, enable_wal
+from semantic_cache import SemanticAnswerCache
+from prompt_cache import PromptCache
+from prompt_rules import RuleBasedEnhancer, schema_vocabulary
+from sql_templates import TemplateRouter
+from pipeline import QueryPipeline, answer_prompt
+from schema_summary import compact_schema, read_schema
+from join_graph import JoinGraph, JoinGraphRetriever
+from schema_docs import load_schema_docs, schema_docs
+from lexical_retriever import BM25SchemaRetriever, HybridSchemaRetriever
+from mmap_index import MmapVectorStore
+from embedding_providers import BatchingEmbeddings, CachedEmbeddings, create_embeddings
+from index_builder import embedding_model_name, read_manifest
+
 
 load_dotenv()
 if not os.getenv("OPENAI_API_KEY"):
@@ -22,24 +53,79 @@ if not os.getenv("OPENAI_API_KEY"):
     
 print("Initializig core components...")
 llm = ChatOpenAI(model='gpt-4o', temperature=0)
-embeddings = OpenAIEmbeddings()
+embeddings = create_embeddings(
+    config.EMBEDDING_PROVIDER,
+    config.EMBEDDING_MODEL,
+    dim=config.EMBEDDING_DIM,
+    batch_size=config.EMBED_BATCH_SIZE,
+    cache_size=config.EMBEDDING_CACHE_SIZE,
+    batch_wait_ms=config.EMBEDDING_BATCH_WAIT_MS,
+    max_query_batch=config.EMBEDDING_MAX_QUERY_BATCH
+)
 
-db = SQLDatabase.from_uri("sqlite:///Database/retail.db")
+if config.SQLITE_WAL:
+    enable_wal(config.DB_PATH)
+engine = create_readonly_engine(
+    config.DB_PATH,
+    pool_size=config.WORKER_THREADS,
+    busy_timeout_ms=config.SQLITE_BUSY_TIMEOUT_MS
+)
+db = SQLDatabase(engine)
 
 try:
-    vectorstore = FAISS.load_local(
-        "faiss_index",
-        embeddings,
-        allow_dangerous_deserialization=True
-    )
-except ImportError:
-    print("FAISS is not installed. Run 'pip install faiss-cpu'")
-    exit()
+    lexical_docs = load_schema_docs(config.SCHEMA_DOCS, engine)
 except Exception as e:
-    print(f"Could not load FAISS index. Did you run 'create_rag_index.py'? Error: {e}")
-    exit()
+    print(f"Could not introspect the database for the BM25 index, using the curated docs. Error: {e}")
+    lexical_docs = schema_docs
+lexical_retriever = BM25SchemaRetriever.from_documents(lexical_docs, k=config.SCHEMA_RETRIEVER_K)
+
+if config.SCHEMA_RETRIEVER == "bm25":
+    retriever = lexical_retriever
+else:
+    try:
+        if config.SCHEMA_INDEX_FORMAT == "mmap":
+            vectorstore = MmapVectorStore("schema_index", embeddings)
+        else:
+            vectorstore = FAISS.load_local(
+                "faiss_index",
+                embeddings,
+                allow_dangerous_deserialization=True
+            )
+    except ImportError:
+        print("FAISS is not installed. Run 'pip install faiss-cpu'")
+        exit()
+    except Exception as e:
+        print(f"Could not load FAISS index. Did you run 'create_rag_index.py'? Error: {e}")
+        exit()
+    
+    if config.SCHEMA_INDEX_FORMAT == "mmap":
+        index_model = vectorstore.meta.get("embedding_model")
+    else:
+        index_model = (read_manifest("faiss_index") or {}).get("embedding_model")
+    if index_model and index_model != embedding_model_name(embeddings):
+        print(f"Warning: the schema index was built with '{index_model}' but queries use '{embedding_model_name(embeddings)}'. Re-run 'create_rag_index.py'.")
+    # Older indexes have no manifest, so also compare vector sizes: FAISS fails on every lookup otherwise.
+    index_dim = vectorstore.meta["dim"] if config.SCHEMA_INDEX_FORMAT == "mmap" else vectorstore.index.d
+    try:
+        query_dim = len(embeddings.embed_query("schema"))
+    except Exception as e:
+        print(f"Could not embed a test query to check the schema index. Error: {e}")
+        query_dim = index_dim
+    if query_dim != index_dim:
+        print(f"The schema index holds {index_dim}-dimensional vectors but '{embedding_model_name(embeddings)}' produces {query_dim}. Re-run 'create_rag_index.py'.")
+        exit()
     
-retriever = vectorstore.as_retriever()
+    retriever = vectorstore.as_retriever(search_kwargs={"k": config.SCHEMA_RETRIEVER_K})
+    if config.SCHEMA_RETRIEVER == "hybrid":
+        retriever = HybridSchemaRetriever(lexical=lexical_retriever, vector=retriever, k=config.SCHEMA_RETRIEVER_K)
+
+if config.SCHEMA_JOIN_GRAPH:
+    try:
+        join_graph = JoinGraph(read_schema(config.DB_PATH))
+        retriever = JoinGraphRetriever(base=retriever, graph=join_graph, max_tables=config.SCHEMA_JOIN_GRAPH_MAX_TABLES)
+    except Exception as e:
+        print(f"Could not build the foreign-key graph, using plain schema retrieval. Error: {e}")
+print(f"Schema retriever: {config.SCHEMA_RETRIEVER}{' + join graph' if isinstance(retriever, JoinGraphRetriever) else ''}")
 print("Components initialized successfully.")
 
 schema_retriever_tool = create_retriever_tool(
@@ -48,49 +134,106 @@ schema_retriever_tool = create_retriever_tool(
     "Use this tool to find relevent table and column information (schema) before generating a SQL query. Pass a natural language question as the query."
 )
 
-sql_query_tool = QuerySQLDatabaseTool(db=db)
+sql_cache = None
+if config.SQL_CACHE_ENABLED:
+    sql_cache = SQLResultCache(
+        config.DB_PATH,
+        max_entries=config.SQL_CACHE_MAX_ENTRIES,
+        max_bytes=config.SQL_CACHE_MAX_BYTES,
+        clock_ttl_seconds=config.SQL_CACHE_CLOCK_TTL_SECONDS
+    )
 
-tools = [schema_retriever_tool, sql_query_tool]
+query_guard = QueryGuard(
+    engine,
+    timeout_s=config.SQL_TIMEOUT_SECONDS,
+    max_rows=config.SQL_MAX_ROWS,
+    max_scan_rows=config.SQL_MAX_SCAN_ROWS,
+    table_rows_ttl_s=config.SQL_TABLE_ROWS_TTL_SECONDS
+)
+
+insight_engine = None
+if config.INSIGHT_FACTS_ENABLED:
+    insight_engine = InsightEngine(top_k=config.INSIGHT_TOP_K, max_facts=config.INSIGHT_MAX_FACTS)
+
+result_store = ResultStore(
+    max_results=config.RESULT_STORE_MAX_RESULTS,
+    max_rows=config.RESULT_STORE_MAX_ROWS,
+    ttl_seconds=config.RESULT_STORE_TTL_SECONDS,
+    analyzer=insight_engine.analyze if insight_engine else None
+)
+
+sql_query_tool = StructuredQuerySQLDatabaseTool(
+    db=db,
+    cache=sql_cache,
+    guard=query_guard,
+    results=result_store,
+    sample_rows=config.SQL_SAMPLE_ROWS
+)
+
+@tool
+async def previous_results(turn: int, offset: int = 0) -> str:
+    """Returns the rows of an earlier turn of this conversation (1 = first turn), in the same form as a fresh query, starting at row `offset`. Use it only when a follow-up needs the exact rows of an earlier answer."""
+    return get_previous_results(turn, result_store, config.SQL_SAMPLE_ROWS, max(offset, 0))
+
+# A small schema is cheaper to send with every request than to look up with an
+# embedding call and an extra tool round trip, so it goes straight into the prompt.
+schema_summary = None
+if config.SCHEMA_MODE != "retriever":
+    try:
+        schema_summary = compact_schema(config.DB_PATH)
+    except Exception as e:
+        print(f"Could not build the schema summary, using schema_search. Error: {e}")
+    if schema_summary and config.SCHEMA_MODE == "auto" and count_tokens(schema_summary) > config.SCHEMA_INLINE_MAX_TOKENS:
+        schema_summary = None
+print(f"Schema context: {'inline' if schema_summary else 'retriever'}")
+
+tools = [sql_query_tool, previous_results]
+if schema_summary is None:
+    tools.insert(0, schema_retriever_tool)
+
+# Step 1 of the system prompt, depending on whether the schema is looked up or inlined.
+SCHEMA_STEP_RETRIEVE = """1.  **Retrieve Schema:** Use the 'schema_search' tool. This is mandatory.
+    You must use this tool to get relevant table names, column descriptions, and join info."""
+SCHEMA_STEP_INLINE = """1.  **Read Schema:** The complete database schema is listed at the end of these instructions,
+    with primary keys (PK), foreign keys (FK->table.column) and the join conditions between tables.
+    Use only these tables and columns."""
 
 system_prompt = """
 You are an expert data analyst AI named 'SQL Query Buddy'.
 Your goal is to help users get insights from a retail database.
 You MUST follow this 4-step process for every user question:
 
-1.  **Retrieve Schema:** Use the 'schema_search' tool. This is mandatory.
-    You must use this tool to get relevant table names, column descriptions, and join info.
+{schema_step}
 
 2.  **Generate SQL:** Based ONLY on the retrieved schema context, generate an
     accurate SQL query to answer the user's question.
 
 3.  **Execute Query:** Use the 'QuerySQLDataBaseTool' to run the SQL query.
-    You will get back the raw results.
+    You will get back JSON with the columns, their types, the total row_count and the first
+    rows (a long result is cut to a sample; row_count is always the full count), plus "facts":
+    shares, top contributors, outliers and period-over-period changes computed over every row. If it returns an Error (for example the query
+    was too slow or returned too many rows), follow its advice, revise the SQL and run it again.
 
 4.  **Answer the User:** Format your final response as a single, complete
     message. Do NOT output the steps.
-    Your response MUST be structured using these exact 4 parts:
+    Your response MUST be structured using these exact 2 parts:
 
     **Explanation:**
     [cite_start](Provide a beginner-friendly explanation of the SQL query [cite: 33])
     
-    **SQL:**
-    ```sql
-    [cite_start](The generated SQL query [cite: 41])
-    ```
-    
-    **Raw Results:**
-    ```
-    [cite_start](The raw query results from the tool [cite: 42])
-    ```
-    
     **AI-Driven Insight:**
-    (This is the most important part. Analyze the raw results and provide a
-    [cite_start]concise, human-like insight[cite: 26].
+    (This is the most important part. Analyze the results, building on the "facts"
+    from the tool, and provide a [cite_start]concise, human-like insight[cite: 26].
     Do not just repeat the numbers. Interpret them.
     For example: "Sales in California grew 15%" or
     "Electronics is the dominant category, accounting for 40%/ of sales.")
 
+    Do NOT write out the SQL query or the raw results. The server adds both to your response,
+    exactly as they were executed, between the explanation and the insight.
+
 [cite_start]Remember: Maintain conversation history for follow-ups[cite: 37].
+Earlier answers in the history show only a short summary of their raw results.
+If a follow-up needs the exact rows of an earlier answer, use the 'previous_results' tool.
 
 [Add exactly one line of space after the insight.]
 
@@ -112,40 +255,24 @@ Do NOT ask for clarification again.
 Example:
 AI: "Would you like me to compare this with the previous quarter?"
 User: "Yes"
-→ You must now perform that comparison, following the same 4-step process (retrieve schema, generate SQL, execute, answer).
-"""
+→ You must now perform that comparison, following the same 4-step process ({schema_verb} schema, generate SQL, execute, answer).
+""".format(
+    schema_step=SCHEMA_STEP_RETRIEVE if schema_summary is None else SCHEMA_STEP_INLINE,
+    schema_verb="retrieve" if schema_summary is None else "read"
+)
 
-agent = create_agent(llm, tools, system_prompt=system_prompt)
+if schema_summary is not None:
+    system_prompt += f"\nDatabase schema:\n{schema_summary}\n"
 
-app = FastAPI(
-    title="SQL Query Buddy API",
-    description="API for the Codecademy GenAI Bootcamp Contest Project"
-)
+agent = create_agent(llm, tools, system_prompt=system_prompt)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"]
-)
+if config.AGENT_MODE == "pipeline":
+    chat_runner = QueryPipeline(llm, retriever, sql_query_tool, agent, schema_text=schema_summary)
+else:
+    chat_runner = agent
+print(f"Chat mode: {config.AGENT_MODE}")
 
-class ChatRequest(BaseModel):
-    question: str
-    chat_history: List[Tuple[str, str]]
-    
-class EnhanceRequest(BaseModel):
-    prompt: str
-    
-class ChatResponse(BaseModel):
-    answer: str
-    chat_history: List[Tuple[str, str]]
-    
-@app.post("/enhance-prompt")
-async def enhance_prompt(request: EnhanceRequest):
-    print(f"Refining prompt: {request.prompt}")
-    
-    enhance_system_prompt = """
+enhance_system_prompt = """
     You are an expert AI Data Analyst assistant. Your specific task is to take a short, vague, or incomplete natural-language query from a user about a **retail database** and rewrite it into a clear, specific, and unambiguous question that a data analysis model can effectively answer.
 
     **Core Enhancement Rules:**
@@ -172,54 +299,465 @@ async def enhance_prompt(request: EnhanceRequest):
     User: "most popular items"
     Enhanced: "List the top 10 products by total units sold in the last 30 days."
     """
+
+# Rewrites are keyed by the prompt and model, so editing either starts a fresh cache.
+enhance_cache = PromptCache(
+    config.ENHANCE_CACHE_PATH,
+    namespace=hashlib.sha256(f"{llm.model_name}\n{enhance_system_prompt}".encode()).hexdigest()[:16],
+    max_entries=config.ENHANCE_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.ENHANCE_CACHE_TTL_SECONDS
+)
+
+try:
+    vocabulary = schema_vocabulary(config.DB_PATH)
+except Exception as e:
+    print(f"Could not load schema vocabulary, using defaults. Error: {e}")
+    vocabulary = {}
+
+rule_enhancer = RuleBasedEnhancer(vocabulary) if config.ENHANCE_RULES_ENABLED else None
+template_router = TemplateRouter(vocabulary, max_limit=config.SQL_SAMPLE_ROWS) if config.TEMPLATE_FAST_PATH_ENABLED else None
+
+enhance_sources = Counter()
+
+limiter = RequestLimiter(
+    max_concurrent=config.MAX_CONCURRENT_REQUESTS,
+    max_queue=config.MAX_QUEUE_DEPTH,
+    retry_after=config.RETRY_AFTER_SECONDS
+)
+
+session_store = create_session_store(
+    config.SESSION_BACKEND,
+    config.SESSION_DB_PATH,
+    max_sessions=config.SESSION_MAX_SESSIONS,
+    ttl_seconds=config.SESSION_TTL_SECONDS
+)
+
+history_manager = HistoryManager(
+    llm,
+    keep_turns=config.HISTORY_KEEP_TURNS,
+    token_budget=config.HISTORY_TOKEN_BUDGET,
+    compact_results=config.HISTORY_COMPACT_RESULTS
+)
+
+semantic_cache = None
+if config.SEMANTIC_CACHE_ENABLED:
+    semantic_cache = SemanticAnswerCache(
+        embeddings,
+        threshold=config.SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds=config.SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES,
+        mode=config.SEMANTIC_CACHE_MODE,
+        run_sql=lambda query: sql_query_tool.ainvoke({"query": query}),
+        vocabulary=vocabulary
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync tools (e.g. the SQL tool) are offloaded by LangChain to the loop's
+    # default executor, so bounding it bounds the thread usage per worker.
+    executor = create_executor(config.WORKER_THREADS)
+    asyncio.get_running_loop().set_default_executor(executor)
+    yield
+    executor.shutdown(wait=False)
+
+app = FastAPI(
+    title="SQL Query Buddy API",
+    description="API for the Codecademy GenAI Bootcamp Contest Project",
+    lifespan=lifespan
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"]
+)
+
+# Send either a session_id (server keeps the conversation) or the full
+# chat_history (legacy, stateless). With neither, a new session is started.
+class ChatRequest(BaseModel):
+    question: str
+    session_id: Optional[str] = None
+    chat_history: Optional[List[Tuple[str, str]]] = None
+    # Return the rows of a template-matched question without any LLM narrative.
+    structured: bool = False
+    
+class EnhanceRequest(BaseModel):
+    prompt: str
+    
+class ChatResponse(BaseModel):
+    answer: str
+    session_id: Optional[str] = None
+    chat_history: Optional[List[Tuple[str, str]]] = None
+    history_tokens_saved: Optional[int] = None
+    source: Optional[str] = None
+    result: Optional[dict] = None
+    # The parts of the answer; `answer` is these assembled into markdown.
+    explanation: Optional[str] = None
+    sql: Optional[str] = None
+    raw_results: Optional[str] = None
+    insight: Optional[str] = None
+    follow_up: Optional[str] = None
+    
+@app.post("/enhance-prompt")
+async def enhance_prompt(request: EnhanceRequest):
+    print(f"Refining prompt: {request.prompt}")
+    
+    # The prompt cache is SQLite on disk, so its reads and writes stay off the event loop.
+    cached = await run_blocking(enhance_cache.get, request.prompt)
+    if cached is not None:
+        enhance_sources["cache"] += 1
+        return {"enhanced_prompt": cached, "source": "cache"}
+    
+    confidence = None
+    if rule_enhancer is not None:
+        enhanced_prompt, confidence = rule_enhancer.rewrite(request.prompt)
+        if enhanced_prompt and confidence >= config.ENHANCE_RULES_MIN_CONFIDENCE:
+            enhance_sources["rules"] += 1
+            return {"enhanced_prompt": enhanced_prompt, "source": "rules", "confidence": confidence}
+    
+    async with limiter.slot():
+        try:
+            response = await llm.ainvoke([
+                HumanMessage(content=enhance_system_prompt),
+                HumanMessage(content=request.prompt)
+            ])
+            
+            enhanced_prompt = response.content
+            await run_blocking(enhance_cache.put, request.prompt, enhanced_prompt)
+            enhance_sources["llm"] += 1
+            return {"enhanced_prompt": enhanced_prompt, "source": "llm", "confidence": confidence}
+        except Exception as e:
+            print(f"Error enhancing prompt: {e}")
+            enhance_sources["fallback"] += 1
+            return {"enhanced_prompt": request.prompt, "source": "fallback"}
+    
+async def resolve_conversation(request: ChatRequest):
+    """Returns the Session for a chat request (session_id is None for legacy chat_history requests).
+
+    The session store may be SQLite on disk, so it is only called through run_blocking.
+    """
+    if request.session_id is None and request.chat_history is not None:
+        return Session(session_id=None, turns=list(request.chat_history))
     
+    if request.session_id is None:
+        return await run_blocking(session_store.create)
+    
+    session = await run_blocking(session_store.get, request.session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired.")
+    return session
+
+async def finish_turn(request: ChatRequest, session, ai_answer, tokens_saved=0, summary_changed=False, **fields):
+    if session.session_id is not None:
+        await run_blocking(
+            session_store.append_turn,
+            session.session_id,
+            request.question,
+            ai_answer,
+            summary=session.summary if summary_changed else None,
+            summarized_turns=session.summarized_turns
+        )
+        return ChatResponse(answer=ai_answer, session_id=session.session_id, history_tokens_saved=tokens_saved, **fields)
+    
+    updated_history = session.turns + [[request.question, ai_answer]]
+    return ChatResponse(answer=ai_answer, chat_history=updated_history, history_tokens_saved=tokens_saved, **fields)
+
+def result_summary(query, result):
+    """The handle and shape of a structured SQL tool result, for ChatResponse.result."""
+    payload = parse_payload(result)
+    if payload is None:
+        return None
+    return {
+        "sql": query,
+        "columns": payload["columns"],
+        "types": payload["types"],
+        "row_count": payload["row_count"],
+        "handle": payload["handle"],
+        "facts": payload.get("facts")
+    }
+
+def finalize_answer(model_text, query, result):
+    """Adds the executed SQL and its rows to the model's explanation and insight. Returns (answer, parts)."""
+    payload = parse_payload(result)
+    if payload is None:
+        return model_text, {}
+    stored = result_store.get(payload["handle"])
+    columns, rows = (stored["columns"], stored["rows"]) if stored else (payload["columns"], payload["rows"])
+    return build_answer(model_text, query, columns, rows, config.ANSWER_MAX_ROWS, payload["handle"])
+
+def last_sql_run(messages):
+    """Returns (query, tool output) of the last SQL tool call in an agent run."""
+    queries = {}
+    query, result = None, None
+    for message in messages:
+        for call in getattr(message, "tool_calls", None) or []:
+            if call["name"] == sql_query_tool.name:
+                queries[call["id"]] = call["args"].get("query")
+        if getattr(message, "tool_call_id", None) in queries:
+            query, result = queries[message.tool_call_id], message.content
+    return query, result
+
+async def semantic_lookup(session, question):
+    # Only standalone questions are cached; follow-ups depend on the conversation.
+    if semantic_cache is None or session.turns:
+        return None, None
     try:
-        response = llm.invoke([
-            HumanMessage(content=enhance_system_prompt),
-            HumanMessage(content=request.prompt)
-        ])
-        
-        enhanced_prompt = response.content
-        return {"enhanced_prompt": enhanced_prompt}
+        return await semantic_cache.lookup(question)
     except Exception as e:
-        print(f"Error enhancing prompt: {e}")
-        return {"enhanced_prompt": request.prompt}
+        print(f"Semantic cache lookup failed: {e}")
+        return None, None
+
+def semantic_store(question, vector, ai_answer, query, result, parts):
+    if vector is None or query is None or not isinstance(result, str) or result.startswith("Error:"):
+        return
+    semantic_cache.store(question, vector, ai_answer, sql=query, sql_result=result, parts=parts)
+
+async def semantic_hit(request: ChatRequest, session, cached):
+    """The ChatResponse for a semantic cache hit, with the same fields as a fresh agent answer."""
+    return await finish_turn(
+        request, session, cached["answer"], source="semantic_cache",
+        result=result_summary(cached["sql"], cached["sql_result"]), **cached["parts"]
+    )
+    
+# Moving average of full agent runs, used to estimate what the fast path saves.
+agent_latency_ms = None
+
+def record_agent_latency(started):
+    global agent_latency_ms
+    elapsed = (time.perf_counter() - started) * 1000
+    agent_latency_ms = elapsed if agent_latency_ms is None else 0.8 * agent_latency_ms + 0.2 * elapsed
+
+async def template_fast_path(request: ChatRequest, session):
+    """Answers template-shaped questions with canned SQL, bypassing the agent loop."""
+    if template_router is None:
+        return None
+    match = template_router.match(request.question)
+    if match is None:
+        return None
+    
+    started = time.perf_counter()
+    try:
+        columns, rows = await run_blocking(fetch_rows, engine, match.sql, match.params)
+    except Exception as e:
+        print(f"Template '{match.name}' failed, falling back to the agent: {e}")
+        return None
+    
+    sql = match.display_sql()
+    stored = result_store.put(sql, columns, rows)
+    payload = sample_payload(stored, config.SQL_SAMPLE_ROWS)
+    # Same shape as an agent answer's result: the rows stay behind the handle.
+    result = {"template": match.name, **result_summary(sql, payload)}
+    narrative = ""
+    if not request.structured:
+        async with limiter.slot():
+            try:
+                response = await llm.ainvoke([
+                    HumanMessage(content=answer_prompt.format(
+                        sql=sql,
+                        rows=payload,
+                        question=request.question
+                    ))
+                ])
+            except Exception as e:
+                print(f"Template narrative failed, falling back to the agent: {e}")
+                return None
+        narrative = response.content
+    ai_answer, parts = build_answer(narrative, sql, columns, rows, config.ANSWER_MAX_ROWS, stored["handle"])
     
-@app.post("/chat", response_model=ChatResponse)
+    template_router.record_hit(match.name, (time.perf_counter() - started) * 1000, agent_latency_ms)
+    return await finish_turn(request, session, ai_answer, source="template", result=result, **parts)
+    
+@app.post("/chat", response_model=ChatResponse, response_model_exclude_none=True)
 async def chat(request: ChatRequest):
     print(f"Request received: {request.question}")
     
-    history_messages = []
-    for item in request.chat_history:
-        if isinstance(item, list) and len(item) == 2:
-            human, ai = item
-            history_messages.append(HumanMessage(content=human))
-            history_messages.append(AIMessage(content=ai))
-        
-    history_messages.append(HumanMessage(content=request.question))
+    session = await resolve_conversation(request)
     
-    try:
-        response = agent.invoke({
-            "messages": history_messages
-        })
+    fast = await template_fast_path(request, session)
+    if fast is not None:
+        return fast
+    
+    cached, vector = await semantic_lookup(session, request.question)
+    if cached is not None:
+        return await semantic_hit(request, session, cached)
+    
+    async with limiter.slot():
+        try:
+            history_messages, tokens_saved, summary_changed = await history_manager.prepare(session, request.question)
+            
+            started = time.perf_counter()
+            response = await chat_runner.ainvoke({
+                "messages": history_messages
+            })
+            record_agent_latency(started)
+            
+            query, result = last_sql_run(response["messages"])
+            ai_answer, parts = finalize_answer(response["messages"][-1].content, query, result)
+            semantic_store(request.question, vector, ai_answer, query, result, parts)
+            
+            return await finish_turn(
+                request, session, ai_answer, tokens_saved, summary_changed,
+                source=config.AGENT_MODE, result=result_summary(query, result), **parts
+            )
         
-        ai_answer = response["messages"][-1].content
+        except Exception as e:
+            print(f"Error during agent invocation: {e}")
+            return ChatResponse(
+                answer=f"Sorry, an error occurred while processing your request: {e}",
+                session_id=session.session_id,
+                chat_history=request.chat_history
+            )
         
-        updated_history = request.chat_history + [[request.question,  ai_answer]]
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def stream_agent_events(history_messages):
+    # "updates" gives us whole steps (tool calls / tool results), "messages"
+    # gives us the LLM tokens as they are generated.
+    ai_answer = ""
+    query, result = None, None
+    async for mode, chunk in chat_runner.astream(
+        {"messages": history_messages},
+        stream_mode=["updates", "messages"]
+    ):
+        if mode == "messages":
+            message, metadata = chunk
+            if metadata.get("langgraph_node") == "model" and isinstance(message.content, str) and message.content:
+                yield "token", {"text": message.content}
+            continue
         
-        return ChatResponse(answer=ai_answer, chat_history=updated_history)
+        for node, update in chunk.items():
+            for message in (update or {}).get("messages", []):
+                if node == "model":
+                    for call in getattr(message, "tool_calls", None) or []:
+                        yield "tool_start", {"tool": call["name"], "input": call["args"]}
+                        if call["name"] == sql_query_tool.name:
+                            query = call["args"].get("query", "")
+                            yield "sql", {"query": query}
+                    if not getattr(message, "tool_calls", None):
+                        ai_answer = message.content
+                elif node == "tools":
+                    yield "tool_end", {"tool": message.name}
+                    if message.name == sql_query_tool.name:
+                        result = message.content
+                        yield "rows", {"content": result}
     
-    except Exception as e:
-        print(f"Error during agent invocation: {e}")
-        return ChatResponse(
-            answer=f"Sorry, an error occurred while processing your request: {e}",
-            chat_history=request.chat_history
-        )
+    yield "answer", {"answer": ai_answer, "query": query, "result": result}
+    
+async def single_answer_stream(response: ChatResponse):
+    yield sse_event("token", {"text": response.answer})
+    yield sse_event("done", response.model_dump(exclude_none=True))
+    
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    print(f"Streaming request received: {request.question}")
+    
+    session = await resolve_conversation(request)
+    
+    fast = await template_fast_path(request, session)
+    if fast is not None:
+        return StreamingResponse(single_answer_stream(fast), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+    
+    cached, vector = await semantic_lookup(session, request.question)
+    if cached is not None:
+        response = await semantic_hit(request, session, cached)
+        return StreamingResponse(single_answer_stream(response), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+    
+    # Acquire the slot before the response starts so saturation still maps to a 503.
+    await limiter.acquire()
+    released = False
+    
+    def release_slot():
+        nonlocal released
+        if not released:
+            released = True
+            limiter.release()
+    
+    async def event_stream():
+        try:
+            history_messages, tokens_saved, summary_changed = await history_manager.prepare(session, request.question)
+            
+            ai_answer, result, parts = "", None, {}
+            async for event, data in stream_agent_events(history_messages):
+                if event == "answer":
+                    # The streamed tokens are the model's text; "done" carries the assembled answer.
+                    ai_answer, parts = finalize_answer(data["answer"], data["query"], data["result"])
+                    result = result_summary(data["query"], data["result"])
+                    semantic_store(request.question, vector, ai_answer, data["query"], data["result"], parts)
+                    continue
+                yield sse_event(event, data)
+            
+            response = await finish_turn(
+                request, session, ai_answer, tokens_saved, summary_changed,
+                source=config.AGENT_MODE, result=result, **parts
+            )
+            yield sse_event("done", response.model_dump(exclude_none=True))
+        except Exception as e:
+            print(f"Error during agent streaming: {e}")
+            yield sse_event("error", {"message": f"Sorry, an error occurred while processing your request: {e}"})
+        finally:
+            release_slot()
+    
+    # The background task covers clients that disconnect before the stream starts.
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release_slot)
+    )
         
 @app.get("/")
 def root():
     return {"message": "SQL Query Buddy API is running!"}
 
+@app.post("/sessions")
+def create_session():
+    return {"session_id": session_store.create().session_id}
+
+@app.get("/sessions/{session_id}")
+def get_session(session_id: str):
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired.")
+    return {"session_id": session.session_id, "turns": session.turns}
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    return {"deleted": session_store.delete(session_id)}
+
+@app.get("/results/{handle}")
+def get_result(handle: str, offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=config.RESULT_PAGE_MAX_SIZE)):
+    page = result_store.page(handle, offset, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired. Run the query again.")
+    return page
+
+@app.get("/stats")
+def stats():
+    return {
+        "concurrency": limiter.stats(),
+        "sessions": session_store.stats(),
+        "history": history_manager.stats(),
+        "db_pool": {"size": engine.pool.size(), "checked_out": engine.pool.checkedout()},
+        "query_guard": query_guard.stats(),
+        "results": result_store.stats(),
+        "insights": insight_engine.stats() if insight_engine else None,
+        "sql_cache": sql_cache.stats() if sql_cache else None,
+        "semantic_cache": semantic_cache.stats() if semantic_cache else None,
+        "embeddings": embeddings.stats() if isinstance(embeddings, (CachedEmbeddings, BatchingEmbeddings)) else None,
+        "enhance_cache": enhance_cache.stats(),
+        "enhance_sources": dict(enhance_sources),
+        "template_fast_path": template_router.stats() if template_router else None,
+        "schema": {
+            "mode": "inline" if schema_summary else "retriever",
+            "tokens": count_tokens(schema_summary) if schema_summary else None
+        },
+        "agent_latency_ms": round(agent_latency_ms, 1) if agent_latency_ms else None,
+        "pipeline": chat_runner.stats() if isinstance(chat_runner, QueryPipeline) else None
+    }
+
 if __name__ == "__main__":
     print("Starting FastAPI server on http://localhost:8000")
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,176 @@
+import json
+import os
+import shutil
+import sqlite3
+import uuid
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+# Layout of an index directory:
+#   meta.json    dimension, count, dtype and embedding model
+#   vectors.npy  (count, dim) float32, or int8 with a per-row scale in scales.npy
+#   norms.npy    squared L2 norm of every stored vector, for L2 distances
+#   docstore.db  SQLite table of page_content/metadata by row number
+# Nothing is unpickled, and vectors are memory-mapped, so worker processes share
+# the pages through the OS cache and opening the index does not read it.
+
+
+def export_index(vectorstore, path, dtype="float32", embedding_model=None, vectors=None):
+    """Writes a FAISS vectorstore in the memory-mappable format (see write_index).
+
+    Pass the raw `vectors` (in index order) for compressed indexes such as IVF-PQ,
+    which cannot give back their original vectors.
+    """
+    ids = [vectorstore.index_to_docstore_id[i] for i in range(vectorstore.index.ntotal)]
+    if vectors is None:
+        vectors = vectorstore.index.reconstruct_n(0, len(ids)) if ids else np.zeros((0, vectorstore.index.d))
+    docs = [vectorstore.docstore.search(doc_id) for doc_id in ids]
+    write_index(path, ids, docs, np.asarray(vectors, dtype=np.float32).reshape(len(ids), vectorstore.index.d),
+                dtype, embedding_model)
+
+
+def write_index(path, ids, docs, vectors, dtype="float32", embedding_model=None):
+    """Writes documents and their (count, dim) vectors in the memory-mappable format.
+
+    The index is written to a temporary directory that then replaces `path`, so it is
+    never seen half-written; the swap is two renames, though, so `path` is briefly missing.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        stored = np.round(vectors / scales[:, None]).astype(np.int8)
+        np.save(os.path.join(tmp_path, "scales.npy"), scales.astype(np.float32))
+        vectors = stored.astype(np.float32) * scales[:, None]
+    else:
+        stored = vectors
+    np.save(os.path.join(tmp_path, "vectors.npy"), stored)
+    np.save(os.path.join(tmp_path, "norms.npy"), (vectors ** 2).sum(axis=1).astype(np.float32))
+
+    conn = sqlite3.connect(os.path.join(tmp_path, "docstore.db"))
+    conn.execute("CREATE TABLE docs (row INTEGER PRIMARY KEY, id TEXT, page_content TEXT, metadata TEXT)")
+    conn.executemany(
+        "INSERT INTO docs VALUES (?, ?, ?, ?)",
+        (
+            (row, doc_id, doc.page_content, json.dumps(doc.metadata, default=str))
+            for row, (doc_id, doc) in enumerate(zip(ids, docs))
+        )
+    )
+    conn.commit()
+    conn.close()
+
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({"dim": int(vectors.shape[1]), "count": len(ids), "dtype": dtype, "embedding_model": embedding_model}, f)
+
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+class MmapVectorStore(VectorStore):
+    """Read-only, exact L2 search over an index written by export_index() or from_texts().
+
+    Only meta.json is read when the store is created; the vectors are memory-mapped
+    on the first search and documents are fetched from SQLite by row.
+    """
+
+    def __init__(self, path, embedding, chunk_rows=65536):
+        self.path = path
+        self.embedding = embedding
+        self.chunk_rows = chunk_rows
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self._vectors = None
+        self._scales = None
+        self._norms = None
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    def _open(self):
+        if self._vectors is None:
+            self._norms = np.load(os.path.join(self.path, "norms.npy"), mmap_mode="r")
+            if self.meta["dtype"] == "int8":
+                self._scales = np.load(os.path.join(self.path, "scales.npy"), mmap_mode="r")
+            self._vectors = np.load(os.path.join(self.path, "vectors.npy"), mmap_mode="r")
+        return self._vectors
+
+    def _nearest(self, query, k):
+        vectors = self._open()
+        query = np.asarray(query, dtype=np.float32)
+        best_rows, best_distances = np.zeros(0, np.int64), np.zeros(0, np.float32)
+        # Work through the mapped array in chunks so memory stays flat as the index grows.
+        for start in range(0, len(vectors), self.chunk_rows):
+            chunk = np.asarray(vectors[start:start + self.chunk_rows], dtype=np.float32)
+            dots = chunk @ query
+            if self._scales is not None:
+                dots *= self._scales[start:start + len(chunk)]
+            distances = self._norms[start:start + len(chunk)] - 2 * dots + float(query @ query)
+            rows = np.arange(start, start + len(chunk))
+            best_rows = np.concatenate([best_rows, rows])
+            best_distances = np.concatenate([best_distances, distances])
+            if len(best_rows) > k:
+                keep = np.argpartition(best_distances, k)[:k]
+                best_rows, best_distances = best_rows[keep], best_distances[keep]
+        order = np.argsort(best_distances)
+        return best_rows[order], best_distances[order]
+
+    def _documents(self, rows):
+        conn = sqlite3.connect(f"file:{os.path.join(self.path, 'docstore.db')}?mode=ro", uri=True)
+        try:
+            placeholders = ",".join("?" * len(rows))
+            found = {
+                row: Document(page_content=content, metadata=json.loads(metadata), id=doc_id)
+                for row, doc_id, content, metadata in conn.execute(
+                    f"SELECT row, id, page_content, metadata FROM docs WHERE row IN ({placeholders})", [int(r) for r in rows]
+                )
+            }
+        finally:
+            conn.close()
+        return [found[int(row)] for row in rows]
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs) -> List[Tuple[Document, float]]:
+        if not self.meta["count"]:
+            return []
+        rows, distances = self._nearest(embedding, k)
+        return list(zip(self._documents(rows), (float(d) for d in distances)))
+
+    def similarity_search_with_score(self, query, k=4, **kwargs) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    async def asimilarity_search_with_score(self, query, k=4, **kwargs) -> List[Tuple[Document, float]]:
+        vector = await self.embedding.aembed_query(query)
+        return self.similarity_search_with_score_by_vector(vector, k)
+
+    def similarity_search(self, query, k=4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    async def asimilarity_search(self, query, k=4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k)]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, path="schema_index", dtype="float32", **kwargs):
+        """Embeds `texts`, writes them as a new index at `path` (replacing any there) and opens it."""
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [uuid.uuid4().hex for _ in texts]
+        docs = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+        vectors = np.asarray(embedding.embed_documents(texts), dtype=np.float32)
+        if not texts:
+            vectors = np.zeros((0, len(embedding.embed_query("schema"))), dtype=np.float32)
+        model = getattr(embedding, "model", None) or type(embedding).__name__
+        write_index(path, ids, docs, vectors, dtype, model)
+        return cls(path, embedding)
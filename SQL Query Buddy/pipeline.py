@@ -0,0 +1,161 @@
+import re
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+sql_generation_prompt = """
+You are an expert SQLite analyst for a retail database.
+Using ONLY the schema context below, write one SQLite query that answers the user's latest question.
+Use the conversation for context (e.g. a "yes" means: run the follow-up you suggested last).
+Return ONLY the SQL query, without explanation or markdown.
+If the question cannot be answered with a SQL query, return exactly: NO_SQL
+
+Schema context:
+{schema}
+"""
+
+# Used when the SQL has already been produced and executed, and only the answer text is needed.
+# The server adds the SQL and the raw results to the answer itself, so the model does not re-type them.
+answer_prompt = """
+You are an expert data analyst AI named 'SQL Query Buddy'.
+The user's question has already been answered with the SQL query and results below.
+
+SQL:
+```sql
+{sql}
+```
+
+Results (JSON: the columns, the total row_count, the first rows and facts computed over every row):
+```
+{rows}
+```
+
+Write the final response using these exact 2 parts. Do NOT repeat the SQL or the results;
+they are added to your response automatically.
+
+**Explanation:**
+(A beginner-friendly explanation of the SQL query)
+
+**AI-Driven Insight:**
+(A concise, human-like interpretation of the results. Do not just repeat the numbers.
+Build it on the facts: they cover all rows, while the rows shown may be only a sample.)
+
+Add exactly one line of space after the insight, then continue with one single natural follow-up question
+that fits the insight. Do NOT include any title for it.
+
+Question: {question}
+"""
+
+_fence = re.compile(r"^```(?:sql)?\s*|\s*```$", re.IGNORECASE)
+
+
+class QueryPipeline:
+    """Fixed retrieve -> generate SQL -> execute -> answer flow with two LLM calls.
+
+    It mirrors the agent's ainvoke/astream interface (and message shapes), so the
+    rest of the app does not care which one is running. When the generated SQL
+    fails, or the question is not a SQL question, the ReAct agent takes over.
+    """
+
+    def __init__(self, llm, retriever, sql_tool, agent, schema_tool_name="schema_search", schema_text=None):
+        self.llm = llm
+        self.retriever = retriever
+        # With an inline schema there is nothing to retrieve, so the schema step is skipped.
+        self.schema_text = schema_text
+        self.sql_tool = sql_tool
+        self.agent = agent
+        self.schema_tool_name = schema_tool_name
+        self.runs = 0
+        self.fallbacks = 0
+
+    async def ainvoke(self, inputs):
+        messages = list(inputs["messages"])
+        async for mode, chunk in self.astream(inputs, stream_mode=["updates"]):
+            for update in chunk.values():
+                messages += (update or {}).get("messages", [])
+        return {"messages": messages}
+
+    async def astream(self, inputs, stream_mode=("updates", "messages")):
+        """Yields (mode, chunk) pairs shaped like the agent's multi-mode astream."""
+        self.runs += 1
+        history, question = list(inputs["messages"][:-1]), inputs["messages"][-1].content
+
+        if self.schema_text is not None:
+            schema, steps = self.schema_text, []
+        else:
+            schema_query = self._retrieval_query(history, question)
+            call, output = await self._call_tool(self.schema_tool_name, {"query": schema_query}, self._schema)
+            for update in self._tool_updates(call, output):
+                yield update
+            schema, steps = output.content, [call, output]
+
+        sql = await self._generate_sql(history, question, schema)
+        if sql is None:
+            async for item in self._fallback(inputs, steps, stream_mode):
+                yield item
+            return
+
+        call, output = await self._call_tool(self.sql_tool.name, {"query": sql}, self._execute)
+        for update in self._tool_updates(call, output):
+            yield update
+        steps += [call, output]
+        if output.content.startswith("Error:"):
+            # The agent continues from the failed attempt, so it sees the error and can revise the SQL.
+            async for item in self._fallback(inputs, steps, stream_mode):
+                yield item
+            return
+
+        prompt = HumanMessage(content=answer_prompt.format(sql=sql, rows=output.content, question=question))
+        text = ""
+        async for chunk in self.llm.astream(history + [prompt]):
+            if isinstance(chunk.content, str) and chunk.content:
+                text += chunk.content
+                if "messages" in stream_mode:
+                    yield "messages", (chunk, {"langgraph_node": "model"})
+
+        yield "updates", {"model": {"messages": [AIMessage(content=text)]}}
+
+    async def _fallback(self, inputs, steps, stream_mode):
+        self.fallbacks += 1
+        messages = list(inputs["messages"]) + steps
+        async for item in self.agent.astream({"messages": messages}, stream_mode=list(stream_mode)):
+            yield item
+
+    @staticmethod
+    def _retrieval_query(history, question):
+        # Short follow-ups ("yes", "do it") say little about the schema, so borrow the last answer.
+        if len(question.split()) < 4 and history:
+            return f"{question}\n{history[-1].content[-300:]}"
+        return question
+
+    async def _schema(self, args):
+        docs = await self.retriever.ainvoke(args["query"])
+        return "\n\n".join(doc.page_content for doc in docs)
+
+    async def _execute(self, args):
+        return await self.sql_tool.ainvoke(args)
+
+    async def _call_tool(self, name, args, run):
+        call_id = f"call_{uuid.uuid4().hex[:12]}"
+        call = AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": call_id}])
+        result = await run(args)
+        return call, ToolMessage(content=str(result), name=name, tool_call_id=call_id)
+
+    @staticmethod
+    def _tool_updates(call, output):
+        yield "updates", {"model": {"messages": [call]}}
+        yield "updates", {"tools": {"messages": [output]}}
+
+    async def _generate_sql(self, history, question, schema):
+        response = await self.llm.ainvoke(
+            [SystemMessage(content=sql_generation_prompt.format(schema=schema))]
+            + history
+            + [HumanMessage(content=question)]
+        )
+        sql = _fence.sub("", response.content.strip()).strip()
+        if not sql or sql.upper().startswith("NO_SQL"):
+            return None
+        return sql
+
+    def stats(self):
+        return {"runs": self.runs, "agent_fallbacks": self.fallbacks}
@@ -0,0 +1,92 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_spaces = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt):
+    """Case, whitespace and trailing punctuation do not change a rewrite."""
+    return _spaces.sub(" ", prompt.strip().lower()).strip(" \"'.?!")
+
+
+class PromptCache:
+    """Two-tier (memory + SQLite) cache of prompt rewrites with a TTL.
+
+    `namespace` should change whenever the rewrite itself would change (e.g. a new
+    system prompt or model), so stale rewrites are never served.
+    """
+
+    def __init__(self, path, namespace="", max_entries=2000, ttl_seconds=7 * 24 * 60 * 60):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS prompt_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, prompt):
+        return f"{self.namespace}:{normalize_prompt(prompt)}"
+
+    def get(self, prompt):
+        key = self._key(prompt)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0]
+
+            row = self._conn.execute(
+                "SELECT value, created_at FROM prompt_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] <= self.ttl_seconds:
+                self._remember(key, row[0], row[1])
+                self.disk_hits += 1
+                return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, prompt, value):
+        key = self._key(prompt)
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO prompt_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, now)
+            )
+            self._conn.execute(
+                "DELETE FROM prompt_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+            self._conn.commit()
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        return {
+            "memory_entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses
+        }
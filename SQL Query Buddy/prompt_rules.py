@@ -0,0 +1,269 @@
+import re
+import sqlite3
+
+# Vocabulary mirrors the rules and examples in enhance_system_prompt.
+ENTITIES = {
+    "customers": {"customer", "customers", "client", "clients", "buyer", "buyers", "shopper", "shoppers"},
+    "products": {"product", "products", "item", "items"},
+    "categories": {"category", "categories"},
+    "regions": {"region", "regions", "state", "states", "location", "locations"},
+}
+ENTITY_LABELS = {
+    "customers": "customers",
+    "products": "products",
+    "categories": "product categories",
+    "regions": "regions",
+}
+METRICS = {
+    "revenue": {"revenue", "sales", "sale", "income", "earnings"},
+    "amount": {"amount", "spend", "spent", "spending", "purchase", "purchases", "value"},
+    "units": {"units", "unit", "quantity", "quantities", "sold", "volume"},
+    "orders": {"orders", "order"},
+}
+METRIC_LABELS = {
+    "revenue": "total sales revenue",
+    "amount": "total purchase amount",
+    "units": "total units sold",
+    "orders": "total number of orders",
+}
+# Rule 1 and 4: the most logical metric when none is given.
+DEFAULT_METRIC = {"customers": "amount", "products": "units", "categories": "revenue", "regions": "revenue"}
+# Rule 3: default timeframes, following the examples in the prompt.
+DEFAULT_TIMEFRAME = {"customers": "for the last 90 days", "products": "in the last 30 days"}
+# Time groupings need a window that spans several periods.
+PERIOD_TIMEFRAME = {"month": "for the last 12 months", "week": "for the last 12 weeks", "day": "for the last 30 days"}
+GROUPS = {
+    "category": "product category", "categories": "product category",
+    "region": "region", "regions": "region", "state": "region",
+    "month": "month", "monthly": "month", "day": "day", "daily": "day", "week": "week", "weekly": "week",
+    "customer": "customer", "product": "product",
+}
+RANK_UP = {"top", "best", "most", "highest", "biggest", "largest", "leading", "popular", "greatest"}
+RANK_DOWN = {"bottom", "worst", "least", "lowest", "smallest", "weakest"}
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "fifteen": 15, "twenty": 20, "fifty": 50, "hundred": 100,
+}
+FILLER = {
+    "the", "a", "an", "me", "show", "list", "give", "get", "find", "tell", "what", "which", "who", "whats",
+    "are", "is", "our", "my", "we", "us", "of", "by", "in", "for", "per", "with", "and", "to", "all",
+    "do", "does", "did", "see", "on", "from", "were", "was", "at", "have", "has",
+    "total", "overall", "each", "every", "please", "can", "you", "i", "want", "need", "there", "some",
+}
+MONTHS = [
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+]
+
+_words = re.compile(r"[a-z0-9]+")
+_relative_time = re.compile(r"\b(last|past|previous)\s+(?:(\d+|[a-z]+)\s+)?(day|week|month|quarter|year)s?\b")
+_current_time = re.compile(r"\b(this|current)\s+(day|week|month|quarter|year)\b")
+_year = re.compile(r"\b(20\d{2})\b")
+_month = re.compile(r"\b(" + "|".join(MONTHS) + r")\b(?:\s+(20\d{2}))?")
+# "how many customers", "number of products", "customer count": a count of the entity itself, not a metric.
+_count_of = re.compile(r"\b(?:how\s+many|(?:total\s+)?number\s+of|count\s+of)\s+([a-z]+)|\b([a-z]+)\s+counts?\b")
+_how_much = re.compile(r"\bhow\s+much\b")
+_overview = re.compile(r"\bhow\s+(?:are|is)\s+(?:we|it|things|business|sales|the business)\b(?:\s+doing)?")
+
+
+def schema_vocabulary(db_path):
+    """Known regions, categories and column names from the database, used as recognized words."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        regions = [r[0] for r in conn.execute("SELECT DISTINCT region FROM customers WHERE region IS NOT NULL")]
+        categories = [r[0] for r in conn.execute("SELECT DISTINCT category FROM products WHERE category IS NOT NULL")]
+        tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        columns = {c[1] for t in tables for c in conn.execute(f'PRAGMA table_info("{t}")')}
+    finally:
+        conn.close()
+    return {"regions": regions, "categories": categories, "columns": columns}
+
+
+class RuleBasedEnhancer:
+    """Deterministic rewriter for the common prompt shapes in enhance_system_prompt.
+
+    rewrite() returns (enhanced prompt or None, confidence in [0, 1]). Confidence is
+    the share of the user's words the rewrite used, so anything with words we do not
+    know should go to the LLM instead. Naming a column the rewrite ignores (e.g.
+    "by price") caps it below the usual threshold: the rewrite would answer another question.
+    """
+
+    def __init__(self, vocabulary=None):
+        vocabulary = vocabulary or {}
+        self.regions = {r.lower(): r for r in vocabulary.get("regions", [])}
+        self.categories = {c.lower(): c for c in vocabulary.get("categories", [])}
+        self.columns = {w for c in vocabulary.get("columns", []) for w in c.lower().split("_")}
+
+    def rewrite(self, prompt):
+        text = prompt.strip().lower().replace("'", "")
+        words = _words.findall(text)
+        if not words:
+            return None, 0.0
+
+        known = set()
+        timeframe = self._timeframe(text, known)
+        region = self._match_value(text, self.regions, known)
+        category = self._match_value(text, self.categories, known)
+
+        if _overview.search(text):
+            known.update(_words.findall(_overview.search(text).group(0)))
+            return self._overview(words, known, timeframe, region)
+
+        count = _count_of.search(text)
+        if count:
+            enhanced = self._count(count, words, known, timeframe, region, category)
+            if enhanced:
+                return enhanced, self._confidence(words, known)
+
+        entity = self._first(words, ENTITIES, known)
+        metric = self._first(words, METRICS, known)
+        if metric and _how_much.search(text):
+            known.update({"how", "much"})
+        direction = self._rank(words, known)
+        limit = self._limit(words, known)
+        group = self._group(words, known)
+
+        # "top 5 customers", "best products", "least popular categories"
+        if entity and (direction or limit):
+            if "popular" in words and not metric:
+                metric = "units"
+            metric = metric or DEFAULT_METRIC[entity]
+            tf = timeframe or DEFAULT_TIMEFRAME.get(entity, "for the last 30 days")
+            rank = "bottom" if direction == "down" else "top"
+            where = self._filters(region, category)
+            enhanced = f"Show me the {rank} {limit or 10} {ENTITY_LABELS[entity]}{where} by {METRIC_LABELS[metric]} {tf}."
+            return enhanced, self._confidence(words, known)
+
+        # "product sales", "sales by region", "orders in California"
+        if metric or entity:
+            metric = metric or ("revenue" if entity != "customers" else "amount")
+            where = self._filters(region, category)
+            # Rule 2: add a grouping, unless the user already narrowed it to one region/category.
+            if not group and not where:
+                group = {"customers": "customer", "regions": "region"}.get(entity, "product category")
+            per = f" per {group}" if group else ""
+            tf = timeframe or PERIOD_TIMEFRAME.get(group, "for the current month")
+            enhanced = f"What is the {METRIC_LABELS[metric]}{where}{per} {tf}?"
+            return enhanced, self._confidence(words, known)
+
+        return None, self._confidence(words, known)
+
+    def _count(self, match, words, known, timeframe, region, category):
+        noun = match.group(1) or match.group(2)
+        counted = next((key for key, synonyms in ENTITIES.items() if noun in synonyms), None)
+        if counted is None and noun not in METRICS["orders"]:
+            return None
+        known.update(_words.findall(match.group(0)))
+        label = ENTITY_LABELS[counted] if counted else "orders"
+        group = self._group(words, known)
+        per = f" per {group}" if group else ""
+        # Orders happen over time; customers and products are counted as they stand unless a period is given.
+        tf = timeframe or PERIOD_TIMEFRAME.get(group) or ("" if counted else "for the current month")
+        return f"What is the total number of {label}{self._filters(region, category)}{per}{' ' + tf if tf else ''}?"
+
+    def _overview(self, words, known, timeframe, region):
+        where = self._filters(region, None)
+        if timeframe:
+            enhanced = f"What is the total sales revenue and total number of orders{where} {timeframe}?"
+        else:
+            enhanced = (
+                f"What is the total sales revenue and total number of orders{where} for the last 30 days "
+                "compared to the previous 30 days?"
+            )
+        return enhanced, self._confidence(words, known)
+
+    def _confidence(self, words, known):
+        understood = sum(1 for w in words if w in known or w in FILLER or w.isdigit())
+        confidence = round(understood / len(words), 2)
+        if any(w in self.columns and w not in known and w not in FILLER for w in words):
+            return min(confidence, 0.5)
+        return confidence
+
+    @staticmethod
+    def _first(words, vocabulary, known):
+        for word in words:
+            for key, synonyms in vocabulary.items():
+                if word in synonyms:
+                    known.add(word)
+                    return key
+        return None
+
+    @staticmethod
+    def _rank(words, known):
+        direction = None
+        for word in words:
+            if word in RANK_UP | RANK_DOWN:
+                known.add(word)
+                direction = direction or ("up" if word in RANK_UP else "down")
+        return direction
+
+    @staticmethod
+    def _limit(words, known):
+        for i, word in enumerate(words):
+            if i and words[i - 1] in RANK_UP | RANK_DOWN:
+                if word.isdigit():
+                    return int(word)
+                if word in NUMBER_WORDS:
+                    known.add(word)
+                    return NUMBER_WORDS[word]
+        return None
+
+    @staticmethod
+    def _group(words, known):
+        for i, word in enumerate(words):
+            if word in GROUPS and i and words[i - 1] in {"by", "per", "each", "every"}:
+                known.add(word)
+                return GROUPS[word]
+            if word in {"monthly", "daily", "weekly"}:
+                known.add(word)
+                return GROUPS[word]
+        return None
+
+    @staticmethod
+    def _match_value(text, values, known):
+        for lowered, original in values.items():
+            if re.search(rf"\b{re.escape(lowered)}\b", text):
+                known.update(_words.findall(lowered))
+                return original
+        return None
+
+    @staticmethod
+    def _filters(region, category):
+        where = ""
+        if category:
+            where += f" in the {category} category"
+        if region:
+            where += f" in {region}"
+        return where
+
+    @staticmethod
+    def _timeframe(text, known):
+        match = _relative_time.search(text)
+        if match:
+            amount = match.group(2)
+            if amount and not amount.isdigit() and amount not in NUMBER_WORDS:
+                return None
+            known.update(_words.findall(match.group(0)))
+            count = NUMBER_WORDS.get(amount, amount)
+            unit = match.group(3)
+            if count:
+                return f"for the last {count} {unit}{'s' if str(count) != '1' else ''}"
+            return f"for the previous {unit}"
+        match = _current_time.search(text)
+        if match:
+            known.update(_words.findall(match.group(0)))
+            return f"for the current {match.group(2)}"
+        match = _month.search(text)
+        if match:
+            known.update(_words.findall(match.group(0)))
+            year = f" {match.group(2)}" if match.group(2) else ""
+            return f"in {match.group(1).title()}{year}"
+        match = _year.search(text)
+        if match:
+            known.add(match.group(1))
+            return f"in {match.group(1)}"
+        for word in ("today", "yesterday"):
+            if re.search(rf"\b{word}\b", text):
+                known.add(word)
+                return f"for {word}"
+        return None
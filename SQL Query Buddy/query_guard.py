@@ -0,0 +1,144 @@
+import re
+import threading
+import time
+
+from sqlalchemy import text
+
+_table_ref = re.compile(r"(?:\bfrom|\bjoin|,)\s+([A-Za-z_]\w*)(?:\s+(?:as\s+)?([A-Za-z_]\w*))?", re.IGNORECASE)
+_scan = re.compile(r"^SCAN (\w+)")
+_not_alias = {
+    "where", "on", "using", "join", "inner", "left", "right", "full", "outer", "cross", "natural",
+    "group", "order", "limit", "having", "union", "except", "intersect", "window", "as", "select", "from"
+}
+
+
+class QueryRejected(Exception):
+    """The query was stopped by the guard. The message is written for the model, so it can revise the SQL."""
+
+
+def table_aliases(sql):
+    """Maps every name a table is referred to by in `sql` (its own name or an alias) to the table."""
+    aliases = {}
+    for table, alias in _table_ref.findall(sql):
+        aliases[table.lower()] = table.lower()
+        if alias and alias.lower() not in _not_alias:
+            aliases[alias.lower()] = table.lower()
+    return aliases
+
+
+class QueryGuard:
+    """Runs model-written SQL with a deadline, a plan check and a row cap.
+
+    - Before running, EXPLAIN QUERY PLAN estimates the rows the query visits: full
+      scans in the same loop nest multiply (a cross join of two big tables is their
+      product), index lookups count as one row. Above `max_scan_rows` it is rejected.
+    - While running, SQLite's progress handler aborts the statement at the deadline,
+      so a runaway query cannot pin a worker thread.
+    - At most `max_rows` rows are fetched; a bigger result is an error, not a silent truncation.
+    Table sizes for the estimate are cached for `table_rows_ttl_s`, so tables that grow
+    through ingestion are re-measured.
+    """
+
+    def __init__(self, engine, timeout_s=10.0, max_rows=1000, max_scan_rows=10_000_000, progress_steps=10000,
+                 table_rows_ttl_s=60.0):
+        self.engine = engine
+        self.timeout_s = timeout_s
+        self.max_rows = max_rows
+        self.max_scan_rows = max_scan_rows
+        self.progress_steps = progress_steps
+        self.table_rows_ttl_s = table_rows_ttl_s
+        # table -> (rows, time measured)
+        self._table_rows = {}
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.rejected_plans = 0
+        self.timeouts = 0
+        self.row_cap_hits = 0
+
+    def _rows_in(self, connection, table):
+        with self._lock:
+            cached = self._table_rows.get(table)
+            if cached is not None and time.monotonic() - cached[1] < self.table_rows_ttl_s:
+                return cached[0]
+        try:
+            # max(rowid) is a single index seek and close enough to COUNT(*) for a cost estimate.
+            rows = connection.execute(text(f'SELECT max(rowid) FROM "{table}"')).scalar()
+        except Exception:
+            rows = connection.execute(text(f'SELECT count(*) FROM "{table}"')).scalar()
+        with self._lock:
+            self._table_rows[table] = (rows or 0, time.monotonic())
+        return rows or 0
+
+    def estimate_scan_rows(self, connection, sql):
+        """Returns (estimated rows visited, [(table, rows)] full scans) from the query plan."""
+        plan = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+        aliases = table_aliases(sql)
+        tables = set(connection.execute(text("SELECT lower(name) FROM sqlite_master WHERE type = 'table'")).scalars())
+        loops, scans = {}, []
+        for _, parent, _, detail in plan:
+            match = _scan.match(detail)
+            if not match:
+                continue
+            # Scans of CTEs and subqueries resolve to no table and count as one row.
+            table = aliases.get(match.group(1).lower(), match.group(1).lower())
+            rows = self._rows_in(connection, table) if table in tables else 1
+            scans.append((table, rows))
+            loops[parent] = loops.get(parent, 1) * max(rows, 1)
+        return max(loops.values(), default=0), scans
+
+    def check_plan(self, connection, sql):
+        if not self.max_scan_rows:
+            return
+        estimate, scans = self.estimate_scan_rows(connection, sql)
+        if estimate > self.max_scan_rows:
+            self.rejected_plans += 1
+            tables = " x ".join(f"{table} ({rows:,} rows)" for table, rows in scans)
+            raise QueryRejected(
+                f"the query would visit about {estimate:,} rows (full scans of {tables}), more than the "
+                f"{self.max_scan_rows:,} allowed. Check that every joined table has a join condition "
+                "(JOIN ... ON), and add WHERE filters or aggregate before joining."
+            )
+
+    def run(self, sql, params=None):
+        """Runs one read query and returns (column names, rows as tuples), or raises QueryRejected."""
+        self.queries += 1
+        with self.engine.connect() as connection:
+            self.check_plan(connection, sql)
+
+            raw = connection.connection.driver_connection
+            deadline = time.monotonic() + self.timeout_s if self.timeout_s else float("inf")
+            if self.timeout_s:
+                raw.set_progress_handler(lambda: time.monotonic() > deadline, self.progress_steps)
+            try:
+                result = connection.execute(text(sql), params or {})
+                columns = list(result.keys())
+                rows = result.fetchmany(self.max_rows + 1) if self.max_rows else result.fetchall()
+            except Exception as e:
+                if "interrupted" in str(e) and time.monotonic() > deadline:
+                    self.timeouts += 1
+                    raise QueryRejected(
+                        f"the query was stopped after {self.timeout_s:g} seconds. Make it cheaper: filter "
+                        "with WHERE, join on key columns, or aggregate with GROUP BY."
+                    ) from e
+                raise
+            finally:
+                raw.set_progress_handler(None, 0)
+
+        if self.max_rows and len(rows) > self.max_rows:
+            self.row_cap_hits += 1
+            raise QueryRejected(
+                f"the query returns more than {self.max_rows:,} rows. Aggregate (GROUP BY), "
+                "filter with WHERE, or add a LIMIT so the result fits."
+            )
+        return columns, [tuple(row) for row in rows]
+
+    def stats(self):
+        return {
+            "timeout_s": self.timeout_s,
+            "max_rows": self.max_rows,
+            "max_scan_rows": self.max_scan_rows,
+            "queries": self.queries,
+            "rejected_plans": self.rejected_plans,
+            "timeouts": self.timeouts,
+            "row_cap_hits": self.row_cap_hits
+        }
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from sql_cache import normalize_sql
+
+_type_names = {bool: "integer", int: "integer", float: "real", str: "text", bytes: "blob"}
+
+
+def column_types(rows, width):
+    """SQLite storage class of each column, from its first non-NULL value ("null" if there is none)."""
+    types = ["null"] * width
+    missing = set(range(width))
+    for row in rows:
+        for i in list(missing):
+            if row[i] is not None:
+                types[i] = _type_names.get(type(row[i]), "text")
+                missing.discard(i)
+        if not missing:
+            break
+    return types
+
+
+def result_handle(sql, rows):
+    # The same query with the same rows gets the same handle, so cached tool outputs and
+    # "rerun" comparisons in the semantic cache stay stable.
+    digest = hashlib.sha256(normalize_sql(sql).encode())
+    digest.update(repr(rows).encode())
+    return f"r_{digest.hexdigest()[:20]}"
+
+
+class ResultStore:
+    """Full query results kept server-side behind a handle, so the model only gets a sample.
+
+    Results expire after `ttl_seconds`; the least recently used are evicted once more
+    than `max_results` results or `max_rows` rows in total are held. With an `analyzer`
+    (e.g. InsightEngine.analyze), each result also gets facts computed over all its rows;
+    a result the analyzer fails on is stored without facts.
+    """
+
+    def __init__(self, max_results=200, max_rows=1_000_000, ttl_seconds=3600, analyzer=None):
+        self.max_results = max_results
+        self.max_rows = max_rows
+        self.ttl_seconds = ttl_seconds
+        self.analyzer = analyzer
+        self._results = OrderedDict()
+        # Latest handle per normalized SQL, so an earlier answer can find its rows from its SQL.
+        self._by_sql = {}
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.stored = 0
+        self.pages_served = 0
+        self.analyzer_errors = 0
+
+    def put(self, sql, columns, rows):
+        handle = result_handle(sql, rows)
+        types = column_types(rows, len(columns))
+        facts = []
+        if self.analyzer:
+            try:
+                facts = self.analyzer(list(columns), types, rows)
+            except Exception as e:
+                print(f"Could not compute facts for result {handle}. Error: {e}")
+                self.analyzer_errors += 1
+        entry = {
+            "handle": handle,
+            "sql": sql,
+            "columns": list(columns),
+            "types": types,
+            "rows": rows,
+            "facts": facts,
+            "created_at": time.time()
+        }
+        with self._lock:
+            if handle in self._results:
+                self._rows -= len(self._results.pop(handle)["rows"])
+            self._results[handle] = entry
+            self._by_sql[normalize_sql(sql)] = handle
+            self._rows += len(rows)
+            self.stored += 1
+            while len(self._results) > 1 and (len(self._results) > self.max_results or self._rows > self.max_rows):
+                _, evicted = self._results.popitem(last=False)
+                self._forget(evicted)
+        return entry
+
+    def _forget(self, entry):
+        self._rows -= len(entry["rows"])
+        key = normalize_sql(entry["sql"])
+        if self._by_sql.get(key) == entry["handle"]:
+            del self._by_sql[key]
+
+    def get(self, handle):
+        with self._lock:
+            entry = self._results.get(handle)
+            if entry is None:
+                return None
+            if time.time() - entry["created_at"] > self.ttl_seconds:
+                self._forget(self._results.pop(handle))
+                return None
+            self._results.move_to_end(handle)
+            return entry
+
+    def latest(self, sql):
+        """The most recent stored result of `sql`, or None when there is none or it expired."""
+        handle = self._by_sql.get(normalize_sql(sql))
+        return self.get(handle) if handle else None
+
+    def page(self, handle, offset=0, limit=100):
+        """One page of a stored result, or None when the handle is unknown or expired."""
+        entry = self.get(handle)
+        if entry is None:
+            return None
+        self.pages_served += 1
+        return {
+            "handle": handle,
+            "columns": entry["columns"],
+            "types": entry["types"],
+            "row_count": len(entry["rows"]),
+            "offset": offset,
+            "limit": limit,
+            "rows": entry["rows"][offset:offset + limit]
+        }
+
+    def stats(self):
+        return {
+            "results": len(self._results),
+            "rows": self._rows,
+            "stored": self.stored,
+            "pages_served": self.pages_served,
+            "analyzer_errors": self.analyzer_errors
+        }
+
+
+def sample_payload(entry, sample_rows, max_string_length=300, offset=0):
+    """The JSON the model gets for a stored result: columns, types, row count, the first rows, facts and the handle.
+
+    With an `offset`, the rows start there instead (paging through a result).
+    """
+    rows = entry["rows"]
+    sample = [
+        [value[:max_string_length] + "..." if isinstance(value, str) and len(value) > max_string_length else value
+         for value in row]
+        for row in rows[offset:offset + sample_rows]
+    ]
+    payload = {
+        "columns": entry["columns"],
+        "types": entry["types"],
+        "row_count": len(rows),
+        "rows": sample,
+        "handle": entry["handle"]
+    }
+    if entry.get("facts"):
+        payload["facts"] = entry["facts"]
+    if offset:
+        payload["offset"] = offset
+        payload["note"] = f"Rows {offset + 1} to {offset + len(sample)} of {len(rows)} are shown."
+    elif len(rows) > len(sample):
+        payload["note"] = f"Only the first {len(sample)} of {len(rows)} rows are shown; the full result stays on the server."
+    return json.dumps(payload, default=str, separators=(",", ":"))
+
+
+def parse_payload(content):
+    """The payload dict of a structured SQL tool output, or None for errors and other text."""
+    if not isinstance(content, str) or not content.startswith("{"):
+        return None
+    try:
+        payload = json.loads(content)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) and "handle" in payload else None
@@ -0,0 +1,179 @@
+from langchain_core.documents import Document
+
+from sqlalchemy import inspect, text
+from sqlalchemy.sql import sqltypes
+
+from schema_summary import join_edges, join_paths
+
+# Hand-written descriptions of the retail schema, shared by the FAISS index and the BM25 retriever.
+schema_docs = [
+    Document(
+        page_content="The 'customers' table stores information about customers. It includes a unique 'customer_id' (primary key), 'name', 'email', 'region' (e.g., 'California', 'New York'), and 'signup_date'.",
+        metadata={"table_name": "customers"}
+    ),
+    Document(
+        page_content="The 'products' table contains the product catalog. It has a 'product_id' (primary key), 'name' of the product, 'category' (e.g., 'Electronics', 'Furniture', 'Software'), and 'price'.",
+        metadata={"table_name": "products"}
+    ),
+    Document(
+        page_content="The 'orders' table tracks customer purchases. It includes an 'order_id' (primary key), 'customer_id' (a foreign key linking to the 'customers' table), 'order_date', and the 'total_amount' for the order.",
+        metadata={"table_name": "orders"}
+    ),
+    Document(
+        page_content="The 'order_items' table links orders to products, showing what items were in each order. It has an 'item_id' (primary key), 'order_id' (links to 'orders'), 'product_id' (links to 'products'), the 'quantity' of the product ordered, and the 'subtotal' for that line item.",
+        metadata={"table_name": "order_items"}
+    ),
+    Document(
+        page_content="To find a customer's orders, join 'customers' and 'orders' on 'customers.customer_id = orders.customer_id'.",
+        metadata={"join_info": "customers_orders"}
+    ),
+    Document(
+        page_content="To see the products in a specific order, join 'orders' and 'order_items' on 'orders.order_id = order_items.order_id', then join 'order_items' and 'products' on 'order_items.product_id = products.product_id'.",
+        metadata={"join_info": "orders_items_products"}
+    ),
+    Document(
+        page_content="You can calculate total sales for a customer by joining 'customers' and 'orders' on their 'customer_id' and summing the 'total_amount' from the 'orders' table.",
+        metadata={"query_example": "total_sales_per_customer"}
+    ),
+    Document(
+        page_content="To find sales by product category, you must join 'products', 'order_items', and 'orders' tables. Link 'products.product_id' with 'order_items.product_id', and 'order_items.order_id' with 'orders.order_id'. Then, you can group by 'products.category' and sum 'order_items.subtotal'.",
+        metadata={"query_example": "sales_by_category"}
+    )
+]
+
+
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def _sample_values(conn, engine, table, column, sample_rows, max_distinct):
+    """Distinct values of a low-cardinality column (judged on the first sample_rows rows), else None."""
+    sample = f"(SELECT {_quote(engine, column)} AS value FROM {_quote(engine, table)} LIMIT {int(sample_rows)}) AS sample"
+    distinct, filled = conn.execute(text(f"SELECT COUNT(DISTINCT value), COUNT(value) FROM {sample}")).one()
+    # Mostly-unique columns (names, emails) are not categories, however few rows there are.
+    if not distinct or distinct > max_distinct or distinct * 2 > filled:
+        return None
+    return sorted((row[0] for row in conn.execute(text(f"SELECT DISTINCT value FROM {sample}"))), key=str)
+
+
+def introspect_schema(engine, sample_rows=10000, max_distinct=20):
+    """Tables, columns, keys, indexes, row counts and low-cardinality values of any SQLAlchemy database.
+
+    The result uses read_schema's {"columns", "fks"} layout (plus extra keys), so the
+    join helpers in schema_summary work on it as well.
+    """
+    inspector = inspect(engine)
+    schema = {}
+    with engine.connect() as conn:
+        for table in sorted(inspector.get_table_names()):
+            pk = set(inspector.get_pk_constraint(table).get("constrained_columns") or [])
+            fks = [
+                (column, fk["referred_table"], referred)
+                for fk in inspector.get_foreign_keys(table)
+                for column, referred in zip(fk["constrained_columns"], fk["referred_columns"])
+            ]
+            fk_columns = {column for column, _, _ in fks}
+            columns, samples = [], {}
+            for column in inspector.get_columns(table):
+                name = column["name"]
+                columns.append((name, str(column["type"]), name in pk))
+                if isinstance(column["type"], (sqltypes.String, sqltypes.Enum, sqltypes.Boolean)) \
+                        and name not in pk and name not in fk_columns:
+                    values = _sample_values(conn, engine, table, name, sample_rows, max_distinct)
+                    if values:
+                        samples[name] = values
+            schema[table] = {
+                "columns": columns,
+                "fks": fks,
+                "indexes": [
+                    (index["name"], index["column_names"], bool(index.get("unique")))
+                    for index in inspector.get_indexes(table)
+                ],
+                "row_count": conn.execute(text(f"SELECT COUNT(*) FROM {_quote(engine, table)}")).scalar(),
+                "samples": samples,
+            }
+    return schema
+
+
+def _values_text(values, limit=10):
+    shown = ", ".join(f"'{v}'" for v in values[:limit])
+    return shown + (", ..." if len(values) > limit else "")
+
+
+_magnitudes = ["", "tens of", "hundreds of", "thousands of", "tens of thousands of", "hundreds of thousands of",
+               "millions of", "tens of millions of", "hundreds of millions of", "billions of"]
+
+
+def _size_text(row_count):
+    """A table's size as an order of magnitude, so the document (and its index id) survives new rows."""
+    if not row_count:
+        return "no rows"
+    if row_count < 10:
+        return "a few rows"
+    magnitude = min(len(str(row_count)) - 1, len(_magnitudes) - 1)
+    return f"{_magnitudes[magnitude]} rows"
+
+
+def introspect_schema_docs(engine, sample_rows=10000, max_distinct=20, max_path_tables=3):
+    """Schema documents generated from the live database: one per table, FK join, multi-hop join path and column."""
+    schema = introspect_schema(engine, sample_rows=sample_rows, max_distinct=max_distinct)
+    docs = []
+
+    for table, info in schema.items():
+        columns = []
+        for name, column_type, is_pk in info["columns"]:
+            column = f"'{name}' {column_type}"
+            if is_pk:
+                column += " (primary key)"
+            columns.append(column)
+        content = f"The '{table}' table has {_size_text(info['row_count'])} and the columns {', '.join(columns)}."
+        for column, ref_table, ref_column in info["fks"]:
+            content += f" '{column}' is a foreign key to '{ref_table}.{ref_column}'."
+        if info["indexes"]:
+            indexed = "; ".join(f"{', '.join(cols)}{' (unique)' if unique else ''}" for _, cols, unique in info["indexes"])
+            content += f" Indexed columns: {indexed}."
+        docs.append(Document(page_content=content, metadata={"kind": "table", "table_name": table}))
+
+    for table, column, ref_table, ref_column in join_edges(schema):
+        docs.append(Document(
+            page_content=f"To combine '{table}' with '{ref_table}', join them on '{table}.{column} = {ref_table}.{ref_column}'.",
+            metadata={"kind": "join", "join_info": f"{table}_{ref_table}"}
+        ))
+
+    edges = {}
+    for table, column, ref_table, ref_column in join_edges(schema):
+        edges[(table, ref_table)] = edges[(ref_table, table)] = f"{table}.{column} = {ref_table}.{ref_column}"
+    for path in join_paths(schema):
+        if len(path) > max_path_tables:
+            continue
+        conditions = [edges[(a, b)] for a, b in zip(path, path[1:])]
+        docs.append(Document(
+            page_content=f"To combine '{path[0]}' with '{path[-1]}', go through {', '.join(repr(t) for t in path[1:-1])}: "
+                         f"join on {' and '.join(repr(c) for c in conditions)}.",
+            metadata={"kind": "join_path", "join_info": "_".join(path)}
+        ))
+
+    for table, info in schema.items():
+        references = {column: f"{ref_table}.{ref_column}" for column, ref_table, ref_column in info["fks"]}
+        for name, column_type, is_pk in info["columns"]:
+            content = f"Column '{table}.{name}' ({column_type})"
+            if is_pk:
+                content += f" is the primary key of '{table}'"
+            elif name in references:
+                content += f" references '{references[name]}'"
+            if name in info["samples"]:
+                content += f", values: {_values_text(info['samples'][name])}"
+            docs.append(Document(page_content=content + ".", metadata={"kind": "column", "table_name": table, "column_name": name}))
+
+    return docs
+
+
+def load_schema_docs(source, engine):
+    """The documents to index: "curated" (hand-written), "introspect" (generated) or "both"."""
+    docs = []
+    if source in ("curated", "both"):
+        docs += schema_docs
+    if source in ("introspect", "both"):
+        docs += introspect_schema_docs(engine)
+    return docs
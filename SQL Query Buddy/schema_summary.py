@@ -0,0 +1,96 @@
+import sqlite3
+from collections import deque
+
+_type_names = {"INTEGER": "INT", "DECIMAL(10,2)": "DECIMAL", "VARCHAR": "TEXT"}
+
+
+def read_schema(db_path):
+    """Returns {table: {"columns": [(name, type, is_pk)], "fks": [(column, ref_table, ref_column)]}}."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        tables = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )]
+        schema = {}
+        for table in tables:
+            columns = [(c[1], c[2], bool(c[5])) for c in conn.execute(f'PRAGMA table_info("{table}")')]
+            fks = [(f[3], f[2], f[4]) for f in conn.execute(f'PRAGMA foreign_key_list("{table}")')]
+            schema[table] = {"columns": columns, "fks": fks}
+        return schema
+    finally:
+        conn.close()
+
+
+def join_edges(schema):
+    """FK joins as (table, column, ref_table, ref_column)."""
+    return [
+        (table, column, ref_table, ref_column or column)
+        for table, info in schema.items()
+        for column, ref_table, ref_column in info["fks"]
+        if ref_table in schema
+    ]
+
+
+def join_paths(schema):
+    """Shortest multi-hop join path for every pair of tables not joined directly."""
+    graph = {table: set() for table in schema}
+    for table, _, ref_table, _ in join_edges(schema):
+        graph[table].add(ref_table)
+        graph[ref_table].add(table)
+
+    paths = []
+    tables = sorted(schema)
+    for i, start in enumerate(tables):
+        previous = {start: None}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for neighbour in sorted(graph[node]):
+                if neighbour not in previous:
+                    previous[neighbour] = node
+                    queue.append(neighbour)
+        for end in tables[i + 1:]:
+            if end not in previous or end in graph[start]:
+                continue
+            path, node = [], end
+            while node is not None:
+                path.append(node)
+                node = previous[node]
+            paths.append(list(reversed(path)))
+    return paths
+
+
+def format_table(table, info, fk_targets, columns=None):
+    """One DDL-style line, e.g. orders(order_id INT PK, customer_id INT FK->customers.customer_id).
+
+    `columns` limits the line to those column names (in table order).
+    """
+    parts = []
+    for name, column_type, is_pk in info["columns"]:
+        if columns is not None and name not in columns:
+            continue
+        column = f"{name} {_type_names.get(column_type.upper(), column_type.upper() or 'ANY')}"
+        if is_pk:
+            column += " PK"
+        if (table, name) in fk_targets:
+            column += f" FK->{fk_targets[(table, name)]}"
+        parts.append(column)
+    return f"{table}({', '.join(parts)})"
+
+
+def compact_schema(db_path):
+    """Token-minimal DDL-style summary: one line per table, then join conditions and paths."""
+    schema = read_schema(db_path)
+    fk_targets = {(t, c): f"{rt}.{rc or c}" for t, c, rt, rc in join_edges(schema)}
+
+    lines = [format_table(table, info, fk_targets) for table, info in schema.items()]
+
+    edges = join_edges(schema)
+    if edges:
+        lines.append("Joins:")
+        lines += [f"{t}.{c} = {rt}.{rc}" for t, c, rt, rc in edges]
+    paths = join_paths(schema)
+    if paths:
+        lines.append("Join paths:")
+        lines += [" -> ".join(path) for path in paths]
+    return "\n".join(lines)
@@ -0,0 +1,149 @@
+import re
+import time
+import uuid
+from collections import OrderedDict
+
+from langchain_community.vectorstores import FAISS
+
+from prompt_rules import MONTHS, NUMBER_WORDS, RANK_DOWN, RANK_UP
+
+_words = re.compile(r"[a-z0-9]+")
+
+
+def question_literals(question, vocabulary=None):
+    """The parts of a question that change its answer but barely move its embedding.
+
+    Numbers and years, month names, known region/category values and the ranking
+    direction ("top 5" vs "bottom 10"). Two questions can only share an answer when
+    these are the same.
+    """
+    text = question.lower().replace("'", "")
+    words = _words.findall(text)
+    literals = set()
+    for word in words:
+        if word.isdigit():
+            literals.add(f"n:{int(word)}")
+        elif word in NUMBER_WORDS:
+            literals.add(f"n:{NUMBER_WORDS[word]}")
+        elif word in MONTHS:
+            literals.add(f"m:{word}")
+        elif word in RANK_UP:
+            literals.add("rank:up")
+        elif word in RANK_DOWN:
+            literals.add("rank:down")
+    for kind in ("regions", "categories"):
+        for value in (vocabulary or {}).get(kind, []):
+            if re.search(rf"\b{re.escape(value.lower())}\b", text):
+                literals.add(f"{kind}:{value.lower()}")
+    return frozenset(literals)
+
+
+class SemanticAnswerCache:
+    """Answers near-duplicate questions from earlier agent runs.
+
+    Past questions are embedded into their own FAISS index. A new question whose
+    cosine similarity to a cached one is at least `threshold`, and whose literals
+    (numbers, years, regions, categories, top/bottom) are the same, is a hit. In
+    "answer" mode the cached answer is returned as is; in "rerun" mode the cached SQL
+    is executed again and the answer is only reused when the rows are unchanged.
+    """
+
+    def __init__(self, embeddings, threshold=0.92, ttl_seconds=3600, max_entries=500, mode="answer", run_sql=None,
+                 vocabulary=None):
+        self.embeddings = embeddings
+        self.vocabulary = vocabulary or {}
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.mode = mode
+        self.run_sql = run_sql
+        self._index = None
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.literal_mismatches = 0
+
+    async def lookup(self, question):
+        """Returns (entry, vector). entry is None on a miss; vector can be passed to store()."""
+        vector = await self.embeddings.aembed_query(question)
+        entry = self._nearest(vector, question_literals(question, self.vocabulary))
+        if entry is None:
+            self.misses += 1
+            return None, vector
+
+        if self.mode == "rerun" and entry["sql"] and self.run_sql is not None:
+            fresh = await self.run_sql(entry["sql"])
+            if fresh != entry["sql_result"]:
+                # The data moved on; drop the entry so the agent writes a fresh answer.
+                self.stale += 1
+                self.misses += 1
+                self._remove(entry["id"])
+                return None, vector
+
+        self._entries.move_to_end(entry["id"])
+        self.hits += 1
+        return entry, vector
+
+    def store(self, question, vector, answer, sql=None, sql_result=None, parts=None):
+        """Caches an answer; `parts` are its sections (explanation, sql, ...), returned with it on a hit."""
+        entry_id = uuid.uuid4().hex
+        metadata = {"entry_id": entry_id}
+        if self._index is None:
+            self._index = FAISS.from_embeddings(
+                [(question, vector)], self.embeddings, metadatas=[metadata], ids=[entry_id], normalize_L2=True
+            )
+        else:
+            self._index.add_embeddings([(question, vector)], metadatas=[metadata], ids=[entry_id])
+
+        self._entries[entry_id] = {
+            "id": entry_id,
+            "question": question,
+            "answer": answer,
+            "sql": sql,
+            "sql_result": sql_result,
+            "parts": dict(parts or {}),
+            "literals": question_literals(question, self.vocabulary),
+            "created_at": time.time()
+        }
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _nearest(self, vector, literals):
+        if self._index is None or not self._entries:
+            return None
+        # Several of the closest matches may have expired, so look a little further.
+        for document, distance in self._index.similarity_search_with_score_by_vector(vector, k=4):
+            entry = self._entries.get(document.metadata["entry_id"])
+            if entry is None:
+                continue
+            if time.time() - entry["created_at"] > self.ttl_seconds:
+                self._remove(entry["id"])
+                continue
+            # Vectors are L2-normalized, so squared L2 distance d maps to cosine 1 - d/2.
+            similarity = 1 - distance / 2
+            if similarity < self.threshold:
+                return None
+            if entry["literals"] != literals:
+                # "top 5" vs "top 10", "2023" vs "2024": close in meaning, different answer.
+                self.literal_mismatches += 1
+                continue
+            return dict(entry, similarity=round(float(similarity), 4))
+        return None
+
+    def _remove(self, entry_id):
+        if self._entries.pop(entry_id, None) is not None:
+            self._index.delete([entry_id])
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "threshold": self.threshold,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "literal_mismatches": self.literal_mismatches,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
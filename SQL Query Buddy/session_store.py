@@ -0,0 +1,160 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict, replace
+
+
+@dataclass
+class Session:
+    session_id: str
+    turns: list = field(default_factory=list)
+    # Rolling summary of turns[:summarized_turns], maintained by the history manager.
+    summary: str = ""
+    summarized_turns: int = 0
+    updated_at: float = field(default_factory=time.time)
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+class MemorySessionStore:
+    """In-process session store with LRU eviction and an idle TTL."""
+
+    def __init__(self, max_sessions=1000, ttl_seconds=86400):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, session):
+        return time.time() - session.updated_at > self.ttl_seconds
+
+    def create(self):
+        session = Session(session_id=new_session_id())
+        with self._lock:
+            self._put(session)
+        return session
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if self._expired(session):
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return replace(session, turns=list(session.turns))
+
+    def append_turn(self, session_id, question, answer, summary=None, summarized_turns=None):
+        with self._lock:
+            session = self._sessions.get(session_id) or Session(session_id=session_id)
+            session.turns.append([question, answer])
+            if summary is not None:
+                session.summary, session.summarized_turns = summary, summarized_turns
+            session.updated_at = time.time()
+            self._put(session)
+            return session
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _put(self, session):
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def stats(self):
+        return {"backend": "memory", "sessions": len(self._sessions)}
+
+
+class SQLiteSessionStore:
+    """On-disk session store so conversations survive restarts and are shared by workers."""
+
+    def __init__(self, path, max_sessions=1000, ttl_seconds=86400):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+        self._conn.commit()
+
+    def _load(self, session_id):
+        row = self._conn.execute(
+            "SELECT data, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        data, updated_at = row
+        if time.time() - updated_at > self.ttl_seconds:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+            return None
+        return Session(**json.loads(data))
+
+    def _save(self, session):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+            (session.session_id, json.dumps(asdict(session)), session.updated_at)
+        )
+        # Evict expired sessions first, then the least recently used ones over the cap.
+        self._conn.execute(
+            "DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl_seconds,)
+        )
+        self._conn.execute(
+            "DELETE FROM sessions WHERE session_id IN ("
+            " SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,)
+        )
+        self._conn.commit()
+
+    def create(self):
+        session = Session(session_id=new_session_id())
+        with self._lock:
+            self._save(session)
+        return session
+
+    def get(self, session_id):
+        with self._lock:
+            return self._load(session_id)
+
+    def append_turn(self, session_id, question, answer, summary=None, summarized_turns=None):
+        with self._lock:
+            session = self._load(session_id) or Session(session_id=session_id)
+            session.turns.append([question, answer])
+            if summary is not None:
+                session.summary, session.summarized_turns = summary, summarized_turns
+            session.updated_at = time.time()
+            self._save(session)
+            return session
+
+    def delete(self, session_id):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def stats(self):
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {"backend": "sqlite", "sessions": count}
+
+
+def create_session_store(backend, path, max_sessions, ttl_seconds):
+    if backend == "sqlite":
+        return SQLiteSessionStore(path, max_sessions=max_sessions, ttl_seconds=ttl_seconds)
+    return MemorySessionStore(max_sessions=max_sessions, ttl_seconds=ttl_seconds)
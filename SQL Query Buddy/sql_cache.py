@@ -0,0 +1,119 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_read_only = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+_tokens = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\s+|[^'\"\s]+")
+# Functions that give a different result on every call: such queries are never cached.
+_volatile = re.compile(r"\b(?:random|randomblob|changes|total_changes|last_insert_rowid)\s*\(", re.IGNORECASE)
+# Reads of the clock ('now', CURRENT_DATE, date() without arguments): the result changes without the data changing.
+_clock = re.compile(
+    r"'now'|\bcurrent_(?:date|time|timestamp)\b|\b(?:date|time|datetime|julianday|unixepoch)\s*\(\s*\)",
+    re.IGNORECASE
+)
+
+
+def normalize_sql(sql):
+    """Collapses whitespace and lowercases everything outside quoted literals."""
+    parts = []
+    for token in _tokens.findall(sql.strip().rstrip(";").strip()):
+        if token.isspace():
+            parts.append(" ")
+        elif token[0] in "'\"":
+            parts.append(token)
+        else:
+            parts.append(token.lower())
+    return "".join(parts)
+
+
+def is_cacheable(sql):
+    return bool(_read_only.match(sql)) and not _volatile.search(sql)
+
+
+def reads_clock(sql):
+    return bool(_clock.search(sql))
+
+
+class SQLResultCache:
+    """Exact-match cache of query results, invalidated whenever the database changes.
+
+    Change detection uses SQLite's PRAGMA data_version (bumped when any other
+    connection commits) plus the database file's mtime (catches a replaced file).
+    Queries that read the clock ("last 30 days" via date('now')) also expire after
+    `clock_ttl_seconds`, since their result moves on while the data stays the same.
+    """
+
+    def __init__(self, db_path, max_entries=256, max_bytes=16 * 1024 * 1024, clock_ttl_seconds=60):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock_ttl_seconds = clock_ttl_seconds
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._version = self._current_version()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expired = 0
+
+    def _current_version(self):
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return data_version, os.stat(self.db_path).st_mtime_ns
+
+    def _check_version(self):
+        version = self._current_version()
+        if version != self._version:
+            self._version = version
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def get(self, sql):
+        key = normalize_sql(sql)
+        with self._lock:
+            self._check_version()
+            if key in self._entries:
+                result, expires_at = self._entries[key]
+                if expires_at is None or time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+                self._bytes -= len(result)
+                self.expired += 1
+            self.misses += 1
+            return None
+
+    def put(self, sql, result):
+        key = normalize_sql(sql)
+        size = len(result)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.clock_ttl_seconds if reads_clock(sql) else None
+        with self._lock:
+            self._check_version()
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key)[0])
+            self._entries[key] = (result, expires_at)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "expired": self.expired
+        }
@@ -0,0 +1,172 @@
+import re
+from dataclasses import dataclass, field
+
+# Parameterized SQL for the question shapes that make up most of our traffic.
+# {where} is filled with the period/region/category filters that were found, and
+# {region_join} brings in customers only when a region filter needs it.
+TEMPLATES = {
+    "top_customers_by_revenue": """
+SELECT c.name AS customer, SUM(o.total_amount) AS total_revenue
+FROM customers c
+JOIN orders o ON c.customer_id = o.customer_id
+{where}
+GROUP BY c.customer_id, c.name
+ORDER BY total_revenue DESC
+LIMIT :n""",
+    "sales_by_category": """
+SELECT p.category AS category, SUM(oi.subtotal) AS total_sales
+FROM products p
+JOIN order_items oi ON p.product_id = oi.product_id
+JOIN orders o ON oi.order_id = o.order_id
+{region_join}
+{where}
+GROUP BY p.category
+ORDER BY total_sales DESC""",
+    "sales_by_region": """
+SELECT c.region AS region, SUM(o.total_amount) AS total_sales
+FROM customers c
+JOIN orders o ON c.customer_id = o.customer_id
+{where}
+GROUP BY c.region
+ORDER BY total_sales DESC""",
+    "orders_by_month": """
+SELECT strftime('%Y-%m', o.order_date) AS month, COUNT(*) AS order_count
+FROM orders o
+{region_join}
+{where}
+GROUP BY month
+ORDER BY month""",
+}
+
+# "how many" is left out of the lead so "how many top customers ..." goes to the agent;
+# orders_by_month accepts it on its own.
+_lead = r"^(?:(?:please\s+)?(?:show|list|give|get|find|tell)(?:\s+me)?|what\s+(?:is|are|were)|who\s+(?:is|are|were))?\s*(?:the\s+)?(?:our\s+)?(?:total\s+)?"
+_revenue = r"(?:total\s+)?(?:sales\s+revenue|revenue|sales|purchase\s+amount|spend(?:ing)?|amount\s+spent|order\s+value)"
+
+# Each pattern has to match the whole question once the slots are removed,
+# so anything we do not understand sends the question to the agent.
+PATTERNS = [
+    ("top_customers_by_revenue", re.compile(
+        _lead + rf"(?:top|best|biggest|highest\s+spending)\s+customers(?:\s+(?:by|based\s+on|in\s+terms\s+of)\s+{_revenue})?$"
+    )),
+    ("sales_by_category", re.compile(
+        _lead + rf"(?:{_revenue}\s+(?:by|per|for\s+each|across)\s+(?:product\s+)?categor(?:y|ies)|(?:product\s+)?category\s+{_revenue}|(?:product\s+)?categor(?:y|ies)\s+by\s+{_revenue})$"
+    )),
+    ("sales_by_region", re.compile(
+        _lead + rf"(?:{_revenue}\s+(?:by|per|for\s+each|across)\s+(?:region|state)s?|(?:region|state)al?\s+{_revenue}|(?:regions|states)\s+by\s+{_revenue})$"
+    )),
+    ("orders_by_month", re.compile(
+        _lead + r"(?:(?:how\s+many\s+|number\s+of\s+|count\s+of\s+)?orders\s+(?:by|per|each)\s+month|monthly\s+orders?(?:\s+count)?|(?:monthly\s+)?order\s+counts?(?:\s+(?:by|per)\s+month)?)$"
+    )),
+]
+
+NUMBER_WORDS = {"three": 3, "five": 5, "ten": 10, "twenty": 20}
+
+_period_relative = re.compile(r"\b(?:for|in|over|during)?\s*(?:the\s+)?(?:last|past)\s+(\d+)\s+(day|week|month|year)s?\b")
+_period_current = re.compile(r"\b(?:for|in|during)?\s*(?:the\s+)?(?:this|current)\s+(month|year)\b")
+_period_year = re.compile(r"\b(?:for|in|during)\s+(20\d{2})\b")
+_limit = re.compile(r"\b(top|best|biggest)\s+(\d+|three|five|ten|twenty)\b")
+
+
+@dataclass
+class TemplateMatch:
+    name: str
+    sql: str
+    params: dict = field(default_factory=dict)
+
+    def display_sql(self):
+        """The SQL with parameters inlined, for showing to users and the model."""
+        def literal(match):
+            value = self.params[match.group(1)]
+            return str(value) if isinstance(value, int) else "'" + str(value).replace("'", "''") + "'"
+        return re.sub(r":(\w+)", literal, self.sql)
+
+
+class TemplateRouter:
+    """Maps common question shapes to parameterized SQL so they can skip the agent.
+
+    A "top N" is kept within 1..max_limit.
+    """
+
+    def __init__(self, vocabulary=None, default_limit=10, max_limit=20):
+        vocabulary = vocabulary or {}
+        self.regions = {r.lower(): r for r in vocabulary.get("regions", [])}
+        self.categories = {c.lower(): c for c in vocabulary.get("categories", [])}
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+        self.hits = {}
+        self.misses = 0
+        self.time_saved_ms = 0.0
+
+    def match(self, question):
+        text = re.sub(r"\s+", " ", question.strip().lower()).strip(" ?.!")
+        conditions, params = [], {}
+
+        text = self._period(text, conditions, params)
+        text = self._value(text, self.regions, "c.region", "region", conditions, params)
+        text = self._value(text, self.categories, "p.category", "category", conditions, params)
+
+        limit = _limit.search(text)
+        if limit:
+            n = NUMBER_WORDS.get(limit.group(2)) or int(limit.group(2))
+            params["n"] = max(1, min(n, self.max_limit))
+            text = text[:limit.start()] + limit.group(1) + text[limit.end():]
+        text = re.sub(r"\s+", " ", text).strip()
+
+        for name, pattern in PATTERNS:
+            if pattern.match(text):
+                if "p.category" in " ".join(conditions) and name != "sales_by_category":
+                    continue
+                if name == "top_customers_by_revenue":
+                    params.setdefault("n", min(self.default_limit, self.max_limit))
+                where = "WHERE " + " AND ".join(conditions) if conditions else ""
+                region_join = "JOIN customers c ON o.customer_id = c.customer_id" if "region" in params else ""
+                sql = TEMPLATES[name].format(where=where, region_join=region_join)
+                return TemplateMatch(name, re.sub(r"\n+", "\n", sql).strip(), params)
+        self.misses += 1
+        return None
+
+    @staticmethod
+    def _period(text, conditions, params):
+        match = _period_relative.search(text)
+        if match:
+            params["period_start"] = f"-{int(match.group(1))} {match.group(2)}s"
+            conditions.append("o.order_date >= date('now', :period_start)")
+            return text[:match.start()] + text[match.end():]
+        match = _period_current.search(text)
+        if match:
+            start = "start of month" if match.group(1) == "month" else "start of year"
+            params["period_start"] = start
+            conditions.append("o.order_date >= date('now', :period_start)")
+            return text[:match.start()] + text[match.end():]
+        match = _period_year.search(text)
+        if match:
+            params["period_year"] = match.group(1)
+            conditions.append("strftime('%Y', o.order_date) = :period_year")
+            return text[:match.start()] + text[match.end():]
+        return text
+
+    @staticmethod
+    def _value(text, values, column, param, conditions, params):
+        for lowered, original in values.items():
+            match = re.search(rf"\b(?:(?:in|for|from)\s+(?:the\s+)?)?{re.escape(lowered)}(?:\s+(?:region|state|category))?\b", text)
+            if match:
+                params[param] = original
+                conditions.append(f"{column} = :{param}")
+                return text[:match.start()] + text[match.end():]
+        return text
+
+    def record_hit(self, name, elapsed_ms, agent_ms):
+        self.hits[name] = self.hits.get(name, 0) + 1
+        if agent_ms:
+            self.time_saved_ms += max(agent_ms - elapsed_ms, 0.0)
+
+    def stats(self):
+        total_hits = sum(self.hits.values())
+        lookups = total_hits + self.misses
+        return {
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_rate": round(total_hits / lookups, 3) if lookups else 0.0,
+            "time_saved_ms": round(self.time_saved_ms, 1)
+        }
@@ -0,0 +1,80 @@
+from typing import Any, Optional
+
+from sqlalchemy import text
+from langchain_core.callbacks import CallbackManagerForToolRun
+from langchain_community.tools.sql_database.tool import QuerySQLDatabaseTool
+
+from sql_cache import is_cacheable
+from result_store import parse_payload, sample_payload
+
+
+class CachedQuerySQLDatabaseTool(QuerySQLDatabaseTool):
+    """QuerySQLDatabaseTool that serves repeated read-only queries from a SQLResultCache.
+
+    Subclasses change how a query is executed by overriding _execute.
+    """
+
+    cache: Any = None
+
+    def _execute(self, query):
+        return self.db.run_no_throw(query)
+
+    def _run(self, query: str, run_manager: Optional[CallbackManagerForToolRun] = None):
+        if self.cache is None or not is_cacheable(query):
+            return self._execute(query)
+
+        cached = self.cache.get(query)
+        if cached is not None and self._is_fresh(cached):
+            return cached
+
+        result = self._execute(query)
+        if isinstance(result, str) and not result.startswith("Error:"):
+            self.cache.put(query, result)
+        return result
+
+    def _is_fresh(self, cached):
+        return True
+
+
+class StructuredQuerySQLDatabaseTool(CachedQuerySQLDatabaseTool):
+    """Returns a query's columns, types, row count and first rows as JSON instead of the str() of every row.
+
+    The full result is kept in a ResultStore and referred to by its handle, so the
+    model never gets more than `sample_rows` rows while clients can page through all
+    of them (GET /results/{handle}). With a QueryGuard, queries run under its deadline,
+    plan check and row cap; a rejected query comes back as an "Error: ..." the model can act on.
+    """
+
+    description: str = """
+    Execute a SQL query against the database. The result is JSON with the column names, their types,
+    the total row_count, a capped sample of the first rows and a handle for the full result.
+    If the query is not correct, an error message will be returned.
+    If an error is returned, rewrite the query, check the query, and try again.
+    """
+    guard: Any = None
+    results: Any = None
+    sample_rows: int = 20
+
+    def _execute(self, query):
+        try:
+            if self.guard is not None:
+                columns, rows = self.guard.run(query)
+            else:
+                columns, rows = fetch_rows(self.db._engine, query)
+        except Exception as e:
+            # QueryRejected messages and database errors alike, as SQLDatabase.run_no_throw reports them.
+            return f"Error: {e}"
+        entry = self.results.put(query, columns, rows)
+        return sample_payload(entry, self.sample_rows, self.db._max_string_length)
+
+    def _is_fresh(self, cached):
+        # A cached output names a stored result, which may have been evicted since.
+        payload = parse_payload(cached)
+        return payload is None or self.results.get(payload["handle"]) is not None
+
+
+def fetch_rows(engine, sql, params=None):
+    """Runs a query and returns (column names, rows as tuples)."""
+    with engine.connect() as connection:
+        result = connection.execute(text(sql), params or {})
+        return list(result.keys()), [tuple(row) for row in result.fetchall()]
@@ -0,0 +1,74 @@
+import argparse
+import os
+import sqlite3
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+
+def enable_wal(db_path):
+    """Switches the database to WAL, so readers never wait for a writer (and the reverse).
+
+    WAL is stored in the database file, so this is a one-off step
+    (python sqlite_engine.py --wal Database/retail.db); it is a no-op when the file
+    is already in WAL mode or cannot be written.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode.lower() != "wal":
+            mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        return mode.lower()
+    except sqlite3.OperationalError as e:
+        print(f"Could not switch {db_path} to WAL. Error: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def create_readonly_engine(db_path, pool_size=8, busy_timeout_ms=5000):
+    """A pooled SQLAlchemy engine whose connections can only read.
+
+    Every connection is opened with mode=ro and PRAGMA query_only, so a generated
+    statement can never modify the data. The pool holds one connection per worker
+    thread (no overflow). Page cache, mmap and temp store keep SQLite's defaults:
+    in bench_sqlite.py, a larger cache and mmap_size made no measurable difference
+    and temp_store=MEMORY cut throughput by about a quarter.
+    """
+    uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+
+    def connect():
+        return sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=busy_timeout_ms / 1000)
+
+    engine = create_engine(
+        "sqlite://",
+        creator=connect,
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_timeout=30,
+        pool_pre_ping=False
+    )
+
+    @event.listens_for(engine, "connect")
+    def read_only(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="One-off maintenance of the app's SQLite database.")
+    parser.add_argument("db_path", help="path of the SQLite database, e.g. Database/retail.db")
+    parser.add_argument("--wal", action="store_true", help="switch the database to WAL journal mode")
+    args = parser.parse_args()
+    if args.wal:
+        print(f"{args.db_path}: journal_mode={enable_wal(args.db_path)}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import unittest
+
+from answer_format import NO_ROWS, assemble_answer, build_answer, parse_answer, render_rows, shown_row_total
+
+MODEL_TEXT = (
+    "**Explanation:**\nAdds up sales per region.\n\n"
+    "**AI-Driven Insight:**\nTexas leads with 40% of sales.\n\n"
+    "Would you like to see this by month?"
+)
+
+
+class RenderRowsTest(unittest.TestCase):
+    def test_table(self):
+        self.assertEqual(
+            render_rows(["region", "sales"], [("Texas", 61015.42000000001), (None, 7)]),
+            "| region | sales    |\n| ------ | -------- |\n| Texas  | 61015.42 |\n| NULL   | 7        |"
+        )
+
+    def test_cut_to_max_rows(self):
+        raw = render_rows(["n"], [(i,) for i in range(1200)], max_rows=3, handle="r_1")
+        self.assertEqual(len(raw.splitlines()), 6)
+        self.assertTrue(raw.endswith("(showing 3 of 1,200 rows; the rest via /results/r_1)"))
+        self.assertEqual(shown_row_total(raw), 1200)
+
+    def test_empty_and_escaped(self):
+        self.assertEqual(render_rows(["n"], []), NO_ROWS)
+        self.assertIn("a\\|b c", render_rows(["text"], [("a|b\nc",)]))
+
+
+class AnswerTest(unittest.TestCase):
+    def test_parse_answer(self):
+        parts = parse_answer(MODEL_TEXT)
+        self.assertEqual(parts["explanation"], "Adds up sales per region.")
+        self.assertEqual(parts["insight"], "Texas leads with 40% of sales.")
+        self.assertEqual(parts["follow_up"], "Would you like to see this by month?")
+        self.assertIsNone(parts["sql"])
+
+    def test_build_answer_uses_executed_sql_and_rows(self):
+        answer, parts = build_answer(MODEL_TEXT, "SELECT region, SUM(total) FROM sales", ["region", "sales"], [("Texas", 10)])
+        self.assertEqual(parts["sql"], "SELECT region, SUM(total) FROM sales")
+        self.assertEqual(answer, assemble_answer(**parts))
+        self.assertLess(answer.index("**Raw Results:**"), answer.index("**AI-Driven Insight:**"))
+        self.assertIn("| Texas  | 10    |", answer)
+
+    def test_free_text_is_unchanged(self):
+        self.assertEqual(build_answer("Hi! Ask me about sales.", None, None, None)[0], "Hi! Ask me about sales.")
+        self.assertEqual(build_answer("Hi there.", "SELECT 1", ["1"], [(1,)])[0], "Hi there.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+
+from answer_format import build_answer
+from history import HistoryManager, compact_answer, current_turns, get_previous_results
+from result_store import ResultStore
+from session_store import Session
+
+MODEL_TEXT = "**Explanation:**\nCounts the rows.\n\n**AI-Driven Insight:**\nNothing unusual.\n\nWant more?"
+
+
+def answer(sql, columns, rows, handle=None):
+    return build_answer(MODEL_TEXT, sql, columns, rows, 50, handle)[0]
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return type("Response", (), {"content": "summary"})()
+
+
+class CompactAnswerTest(unittest.TestCase):
+    def test_empty_result_is_zero_rows(self):
+        compacted = compact_answer(answer("SELECT name FROM customers WHERE 0", ["name"], []), 1)
+        self.assertIn("[0 rows; columns: name;", compacted)
+
+    def test_cut_result_keeps_full_count(self):
+        rows = [(i, i * 2) for i in range(120)]
+        compacted = compact_answer(answer("SELECT id, total FROM orders", ["id", "total"], rows, "r_1"), 3)
+        self.assertIn("[120 rows; columns: id, total;", compacted)
+        self.assertIn("previous_results with turn=3", compacted)
+        self.assertNotIn("| 0 ", compacted)
+        self.assertIn("Nothing unusual.", compacted)
+
+    def test_answer_without_results_is_unchanged(self):
+        self.assertEqual(compact_answer("Hello! Ask me about sales.", 1), "Hello! Ask me about sales.")
+
+
+class PreviousResultsTest(unittest.TestCase):
+    def test_pages_through_stored_result(self):
+        store = ResultStore()
+        rows = [(i,) for i in range(120)]
+        entry = store.put("SELECT id FROM orders", ["id"], rows)
+        current_turns.set([("all orders", answer("SELECT id FROM orders", ["id"], rows, entry["handle"]))])
+        self.assertIn('"rows":[[100],[101]]', get_previous_results(1, store, sample_rows=2, offset=100))
+
+    def test_falls_back_to_rendered_rows(self):
+        rows = [(i,) for i in range(120)]
+        current_turns.set([("all orders", answer("SELECT id FROM orders", ["id"], rows, "r_gone"))])
+        result = get_previous_results(1, ResultStore(), sample_rows=2)
+        self.assertEqual(len(result.splitlines()), 5)
+        self.assertIn("rows 1 to 2 of 120", result)
+
+    def test_unknown_turn(self):
+        current_turns.set([])
+        self.assertTrue(get_previous_results(2).startswith("Error:"))
+
+
+class HistoryManagerTest(unittest.TestCase):
+    turns = [("q" * 200, "a" * 200)] * 6
+
+    def test_sessionless_history_is_windowed_without_summary(self):
+        llm = FakeLLM()
+        manager = HistoryManager(llm, keep_turns=2, token_budget=50)
+        messages, _, changed = asyncio.run(manager.prepare(Session(session_id=None, turns=list(self.turns)), "next"))
+        self.assertEqual((len(messages), changed, llm.calls), (5, False, 0))
+
+    def test_session_history_is_summarized_once(self):
+        llm = FakeLLM()
+        manager = HistoryManager(llm, keep_turns=2, token_budget=50)
+        session = Session(session_id="s", turns=list(self.turns))
+        messages, _, changed = asyncio.run(manager.prepare(session, "next"))
+        self.assertEqual((len(messages), changed, session.summarized_turns), (6, True, 4))
+        asyncio.run(manager.prepare(session, "next"))
+        self.assertEqual(llm.calls, 1)
+
+    def test_small_history_is_sent_as_is(self):
+        manager = HistoryManager(FakeLLM(), keep_turns=2, token_budget=10_000)
+        messages, saved, changed = asyncio.run(manager.prepare(Session(session_id="s", turns=list(self.turns)), "next"))
+        self.assertEqual((len(messages), saved, changed), (13, 0, False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+
+from embedding_providers import HashingEmbeddings
+from index_builder import build_index, choose_index_type, doc_id, read_manifest
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self, dim=64):
+        super().__init__(dim)
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+def docs(*texts):
+    return [Document(page_content=text, metadata={"kind": "table"}) for text in texts]
+
+
+class BuildIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "faiss_index")
+        self.embedding = CountingEmbeddings()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_only_changed_documents_are_embedded(self):
+        first = build_index(docs("orders table", "customers table"), self.embedding, self.path)
+        self.assertEqual((first["added"], self.embedding.embedded), (2, 2))
+
+        again = build_index(docs("orders table", "customers table"), self.embedding, self.path)
+        self.assertEqual((again["added"], again["unchanged"], self.embedding.embedded), (0, 2, 2))
+
+        edited = build_index(docs("orders table", "customers table with region"), self.embedding, self.path)
+        self.assertEqual((edited["added"], edited["removed"], edited["unchanged"]), (1, 1, 1))
+        self.assertEqual(self.embedding.embedded, 3)
+
+    def test_index_matches_its_manifest(self):
+        build_index(docs("orders table", "products table"), self.embedding, self.path)
+        manifest = read_manifest(self.path)
+        self.assertEqual(manifest["embedding_model"], "hashing-64")
+        self.assertEqual(manifest["documents"], sorted(doc_id(d) for d in docs("orders table", "products table")))
+        store = FAISS.load_local(self.path, self.embedding, allow_dangerous_deserialization=True)
+        self.assertEqual(store.similarity_search("products", k=1)[0].page_content, "products table")
+        self.assertEqual([name for name in os.listdir(self.root) if name != "faiss_index"], [])
+
+    def test_another_model_re_embeds_everything(self):
+        build_index(docs("orders table"), self.embedding, self.path)
+        other = CountingEmbeddings(dim=32)
+        self.assertEqual(build_index(docs("orders table"), other, self.path)["added"], 1)
+
+    def test_no_documents(self):
+        with self.assertRaises(ValueError):
+            build_index([], self.embedding, self.path)
+
+    def test_choose_index_type(self):
+        self.assertEqual([choose_index_type(n) for n in (10, 5000, 100000)], ["flat", "hnsw", "ivfpq"])
+        self.assertEqual(choose_index_type(10, "hnsw"), "hnsw")
+
+
+if __name__ == "__main__":
+    unittest.main()
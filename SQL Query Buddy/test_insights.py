@@ -0,0 +1,46 @@
+import unittest
+
+from insights import InsightEngine
+
+
+class InsightEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = InsightEngine()
+
+    def test_null_measure_is_not_a_zero(self):
+        facts = self.engine.analyze(["month", "n"], ["text", "integer"], [("2023-01", 40), ("2023-02", 50), ("2023-03", None)])
+        self.assertIn("n in 2023-02: 50, +25.0% vs 2023-01 (40)", facts)
+        self.assertFalse(any("2023-03" in fact for fact in facts), facts)
+
+    def test_null_measure_drops_dimension_value(self):
+        facts = self.engine.analyze(["region", "n"], ["text", "integer"], [("CA", 40), ("TX", 50), ("NY", None)])
+        self.assertIn("Top 2 of 2 region by n: TX 55.6% (50), CA 44.4% (40); together 100.0% of the total", facts)
+
+    def test_single_period_has_no_changes(self):
+        facts = self.engine.analyze(["month", "n"], ["text", "integer"], [("2023-01", 40), ("2023-01", 50)])
+        self.assertEqual(facts, ["n: total 90, mean 45, median 45, min 40, max 50 over 2 rows"])
+
+    def test_numeric_months_sort_numerically(self):
+        rows = [(month, 100 * month) for month in range(1, 13)]
+        facts = self.engine.analyze(["month", "revenue"], ["integer", "integer"], rows)
+        self.assertIn("revenue in 12: 1,200, +9.1% vs 11 (1,100)", facts)
+        self.assertIn("Peak revenue: 12 (1,200) across 12 periods", facts)
+
+    def test_year_and_month_form_one_period(self):
+        rows = [(year, month, 10) for year in (2023, 2024) for month in range(1, 13)]
+        facts = self.engine.analyze(["year", "month", "revenue"], ["integer", "integer", "integer"], rows)
+        self.assertFalse(any(fact.startswith("month:") or fact.startswith("year:") for fact in facts), facts)
+        self.assertIn("revenue from 2023-01 to 2024-12: +0.0% (10 -> 10)", facts)
+
+    def test_no_drop_without_a_decrease(self):
+        rows = [("2023-01", 10), ("2023-02", 20), ("2023-03", 30)]
+        facts = self.engine.analyze(["month", "n"], ["text", "integer"], rows)
+        self.assertIn("Largest rise in n: 2023-02 (+100.0%)", facts)
+        self.assertFalse(any("drop" in fact for fact in facts), facts)
+
+    def test_single_value_has_no_facts(self):
+        self.assertEqual(self.engine.analyze(["total"], ["integer"], [(42,)]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
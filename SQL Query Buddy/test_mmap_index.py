@@ -0,0 +1,47 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from langchain_community.vectorstores import FAISS
+
+from embedding_providers import HashingEmbeddings
+from mmap_index import MmapVectorStore, export_index
+
+TEXTS = ["orders table with order_date", "customers table with region", "products table with category and price"]
+
+
+class MmapVectorStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.embedding = HashingEmbeddings(dim=64)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_from_texts(self):
+        path = os.path.join(self.root, "schema_index")
+        store = MmapVectorStore.from_texts(TEXTS, self.embedding, metadatas=[{"n": i} for i in range(3)], path=path)
+        self.assertEqual((store.meta["count"], store.meta["dim"], store.meta["embedding_model"]), (3, 64, "hashing-64"))
+        doc = store.similarity_search("which region are customers in", k=1)[0]
+        self.assertEqual((doc.page_content, doc.metadata), (TEXTS[1], {"n": 1}))
+        self.assertEqual(os.listdir(self.root), ["schema_index"])
+
+    def test_export_matches_faiss(self):
+        faiss_store = FAISS.from_texts(TEXTS, self.embedding)
+        for dtype in ("float32", "int8"):
+            with self.subTest(dtype=dtype):
+                path = os.path.join(self.root, dtype)
+                export_index(faiss_store, path, dtype=dtype)
+                store = MmapVectorStore(path, self.embedding)
+                for query in ("product price", "order dates"):
+                    expected = [d.page_content for d in faiss_store.similarity_search(query, k=2)]
+                    self.assertEqual([d.page_content for d in store.similarity_search(query, k=2)], expected)
+
+    def test_empty_index(self):
+        store = MmapVectorStore.from_texts([], self.embedding, path=os.path.join(self.root, "empty"))
+        self.assertEqual(store.similarity_search("orders"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from prompt_rules import RuleBasedEnhancer
+
+VOCABULARY = {
+    "regions": ["California", "Texas", "New York"],
+    "categories": ["Electronics", "Furniture"],
+    "columns": [
+        "customer_id", "name", "email", "region", "signup_date", "product_id", "category", "price",
+        "order_id", "order_date", "total_amount", "item_id", "quantity", "subtotal",
+    ],
+}
+MIN_CONFIDENCE = 0.8
+
+# (prompt, expected rewrite); None means the rules must leave it to the LLM.
+CASES = [
+    # Count-of-entity questions.
+    ("how many customers", "What is the total number of customers?"),
+    ("number of customers", "What is the total number of customers?"),
+    ("customer count by region", "What is the total number of customers per region?"),
+    ("count of products", "What is the total number of products?"),
+    ("how many customers in California", "What is the total number of customers in California?"),
+    ("how many orders", "What is the total number of orders for the current month?"),
+    ("number of orders per month", "What is the total number of orders per month for the last 12 months?"),
+    ("how many widgets", None),
+    # Columns the rewrite cannot rank or group by.
+    ("bottom 5 products by price", None),
+    ("top 5 customers by signup date", None),
+    ("price of products", None),
+    ("orders by date", None),
+    # The four examples in enhance_system_prompt.
+    ("top 5 customers", "Show me the top 5 customers by total purchase amount for the last 90 days."),
+    ("products sales", "What is the total sales revenue per product category for the current month?"),
+    (
+        "how are we doing?",
+        "What is the total sales revenue and total number of orders for the last 30 days "
+        "compared to the previous 30 days?",
+    ),
+    ("most popular items", "Show me the top 10 products by total units sold in the last 30 days."),
+]
+
+
+class RuleBasedEnhancerTest(unittest.TestCase):
+    def test_rewrites(self):
+        enhancer = RuleBasedEnhancer(VOCABULARY)
+        for prompt, expected in CASES:
+            with self.subTest(prompt=prompt):
+                enhanced, confidence = enhancer.rewrite(prompt)
+                if expected is None:
+                    self.assertTrue(enhanced is None or confidence < MIN_CONFIDENCE, (enhanced, confidence))
+                else:
+                    self.assertEqual(enhanced, expected)
+                    self.assertGreaterEqual(confidence, MIN_CONFIDENCE)
+
+
+if __name__ == "__main__":
+    unittest.main()
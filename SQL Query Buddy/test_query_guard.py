@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+
+from query_guard import QueryGuard, QueryRejected, table_aliases
+
+CROSS_JOIN = "SELECT COUNT(*) FROM orders o, customers c"
+
+
+class QueryGuardTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE customers (customer_id INTEGER PRIMARY KEY, region TEXT)")
+        conn.execute("CREATE TABLE orders (order_id INTEGER PRIMARY KEY, customer_id INTEGER REFERENCES customers)")
+        conn.executemany("INSERT INTO customers VALUES (?, ?)", [(i, "CA" if i % 2 else "TX") for i in range(1, 201)])
+        conn.executemany("INSERT INTO orders VALUES (?, ?)", [(i, i % 200 + 1) for i in range(1, 1001)])
+        conn.commit()
+        conn.close()
+        self.engine = create_engine(f"sqlite:///{self.path}")
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def test_runs_a_query(self):
+        guard = QueryGuard(self.engine)
+        columns, rows = guard.run("SELECT region, COUNT(*) AS n FROM customers GROUP BY region ORDER BY region")
+        self.assertEqual((columns, rows), (["region", "n"], [("CA", 100), ("TX", 100)]))
+
+    def test_rejects_cross_join_plan(self):
+        guard = QueryGuard(self.engine, max_scan_rows=10_000)
+        with self.assertRaises(QueryRejected) as raised:
+            guard.run(CROSS_JOIN)
+        self.assertIn("200,000 rows", str(raised.exception))
+        self.assertIn("orders (1,000 rows)", str(raised.exception))
+        self.assertEqual(guard.stats()["rejected_plans"], 1)
+
+    def test_keyed_join_passes_the_plan_check(self):
+        guard = QueryGuard(self.engine, max_scan_rows=10_000)
+        _, rows = guard.run("SELECT COUNT(*) FROM orders o JOIN customers c ON c.customer_id = o.customer_id")
+        self.assertEqual(rows, [(1000,)])
+
+    def test_row_cap(self):
+        guard = QueryGuard(self.engine, max_rows=100)
+        with self.assertRaises(QueryRejected):
+            guard.run("SELECT * FROM customers")
+        self.assertEqual(guard.stats()["row_cap_hits"], 1)
+        self.assertEqual(len(guard.run("SELECT * FROM customers LIMIT 100")[1]), 100)
+
+    def test_timeout(self):
+        guard = QueryGuard(self.engine, timeout_s=0.2, max_scan_rows=0, progress_steps=1000)
+        endless = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT MAX(i) FROM n"
+        with self.assertRaises(QueryRejected) as raised:
+            guard.run(endless)
+        self.assertIn("stopped after 0.2 seconds", str(raised.exception))
+        self.assertEqual(guard.run("SELECT 1")[1], [(1,)])
+
+    def test_table_sizes_are_measured_again_after_ttl(self):
+        guard = QueryGuard(self.engine, max_scan_rows=300_000, table_rows_ttl_s=0)
+        guard.run(CROSS_JOIN)
+        conn = sqlite3.connect(self.path)
+        conn.executemany("INSERT INTO orders VALUES (?, 1)", [(i,) for i in range(1001, 2001)])
+        conn.commit()
+        conn.close()
+        with self.assertRaises(QueryRejected):
+            guard.run(CROSS_JOIN)
+
+    def test_table_aliases(self):
+        aliases = table_aliases("SELECT * FROM orders AS o JOIN customers c ON c.customer_id = o.customer_id WHERE 1")
+        self.assertEqual(aliases, {"orders": "orders", "o": "orders", "customers": "customers", "c": "customers"})
+
+
+if __name__ == "__main__":
+    unittest.main()
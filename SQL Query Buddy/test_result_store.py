@@ -0,0 +1,75 @@
+import json
+import unittest
+
+from result_store import ResultStore, column_types, parse_payload, sample_payload
+
+ROWS = [(i, f"name {i}", i * 1.5) for i in range(30)]
+COLUMNS = ["id", "name", "value"]
+
+
+def failing_analyzer(columns, types, rows):
+    raise OverflowError("int too large to convert to float")
+
+
+class ResultStoreTest(unittest.TestCase):
+    def test_page(self):
+        store = ResultStore()
+        entry = store.put("SELECT * FROM t", COLUMNS, ROWS)
+        page = store.page(entry["handle"], offset=25, limit=10)
+        self.assertEqual((page["row_count"], page["rows"]), (30, ROWS[25:]))
+        self.assertIsNone(store.page("r_unknown"))
+
+    def test_same_query_and_rows_share_a_handle(self):
+        store = ResultStore()
+        first = store.put("SELECT * FROM t", COLUMNS, ROWS)
+        second = store.put("select *\nfrom t", COLUMNS, ROWS)
+        self.assertEqual(first["handle"], second["handle"])
+        self.assertEqual(store.stats()["rows"], 30)
+
+    def test_evicts_by_total_rows(self):
+        store = ResultStore(max_rows=40)
+        first = store.put("SELECT 1", COLUMNS, ROWS)
+        store.put("SELECT 2", COLUMNS, ROWS)
+        self.assertIsNone(store.get(first["handle"]))
+        self.assertEqual(store.stats()["rows"], 30)
+
+    def test_latest_by_sql(self):
+        store = ResultStore()
+        entry = store.put("SELECT * FROM t", COLUMNS, ROWS)
+        self.assertIs(store.latest("select * from t;"), entry)
+        self.assertIsNone(store.latest("SELECT * FROM other"))
+
+    def test_analyzer_failure_keeps_the_result(self):
+        store = ResultStore(analyzer=failing_analyzer)
+        entry = store.put("SELECT * FROM t", COLUMNS, ROWS)
+        self.assertEqual(entry["facts"], [])
+        self.assertIs(store.get(entry["handle"]), entry)
+        self.assertEqual(store.stats()["analyzer_errors"], 1)
+
+
+class SamplePayloadTest(unittest.TestCase):
+    def setUp(self):
+        self.entry = ResultStore().put("SELECT * FROM t", COLUMNS, ROWS)
+
+    def test_sample(self):
+        payload = json.loads(sample_payload(self.entry, 5, max_string_length=3))
+        self.assertEqual(payload["row_count"], 30)
+        self.assertEqual(payload["rows"][0], [0, "nam...", 0.0])
+        self.assertIn("first 5 of 30", payload["note"])
+        self.assertNotIn("offset", payload)
+
+    def test_offset(self):
+        payload = json.loads(sample_payload(self.entry, 5, offset=28))
+        self.assertEqual((payload["offset"], len(payload["rows"])), (28, 2))
+        self.assertEqual(payload["note"], "Rows 29 to 30 of 30 are shown.")
+
+    def test_parse_payload(self):
+        self.assertEqual(parse_payload(sample_payload(self.entry, 5))["handle"], self.entry["handle"])
+        self.assertIsNone(parse_payload("Error: no such table: t"))
+
+    def test_column_types(self):
+        self.assertEqual(column_types([(None, 1, None), (2.5, None, None)], 3), ["real", "integer", "null"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from sql_cache import SQLResultCache, is_cacheable, normalize_sql, reads_clock
+
+
+class CacheabilityTest(unittest.TestCase):
+    def test_reads_are_cacheable(self):
+        self.assertTrue(is_cacheable("SELECT * FROM orders"))
+        self.assertTrue(is_cacheable("  with t as (select 1) select * from t"))
+
+    def test_writes_and_random_are_not(self):
+        self.assertFalse(is_cacheable("DELETE FROM orders"))
+        self.assertFalse(is_cacheable("SELECT * FROM products ORDER BY RANDOM() LIMIT 3"))
+
+    def test_clock_reads(self):
+        for sql in (
+            "SELECT COUNT(*) FROM orders WHERE order_date >= date('now', '-30 days')",
+            "SELECT * FROM orders WHERE order_date = CURRENT_DATE",
+            "SELECT julianday() - julianday(order_date) FROM orders",
+        ):
+            with self.subTest(sql=sql):
+                self.assertTrue(reads_clock(sql))
+        self.assertFalse(reads_clock("SELECT * FROM orders WHERE order_date >= date('2024-01-01')"))
+
+    def test_normalize_keeps_literals(self):
+        self.assertEqual(normalize_sql("SELECT  *\nFROM t WHERE name = 'Bob';"), "select * from t where name = 'Bob'")
+
+
+class SQLResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.writer = sqlite3.connect(self.path)
+        self.writer.execute("CREATE TABLE t (x INTEGER)")
+        self.writer.commit()
+        self.cache = SQLResultCache(self.path, clock_ttl_seconds=60)
+
+    def tearDown(self):
+        self.writer.close()
+        os.remove(self.path)
+
+    def test_hit_until_the_data_changes(self):
+        self.cache.put("SELECT * FROM t", "[]")
+        self.assertEqual(self.cache.get("select *  from t"), "[]")
+        self.writer.execute("INSERT INTO t VALUES (1)")
+        self.writer.commit()
+        self.assertIsNone(self.cache.get("SELECT * FROM t"))
+        self.assertEqual(self.cache.stats()["invalidations"], 1)
+
+    def test_clock_queries_expire(self):
+        sql = "SELECT * FROM t WHERE x > julianday('now')"
+        self.cache.clock_ttl_seconds = 0.05
+        self.cache.put(sql, "[]")
+        self.assertEqual(self.cache.get(sql), "[]")
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get(sql))
+        self.assertEqual(self.cache.stats()["expired"], 1)
+        self.assertEqual(self.cache.stats()["bytes"], 0)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.max_entries = 2
+        for sql in ("SELECT 1", "SELECT 2", "SELECT 3"):
+            self.cache.put(sql, sql)
+        self.assertIsNone(self.cache.get("SELECT 1"))
+        self.assertEqual(self.cache.get("SELECT 3"), "SELECT 3")
+
+
+if __name__ == "__main__":
+    unittest.main()
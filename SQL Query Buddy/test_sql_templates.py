@@ -0,0 +1,48 @@
+import unittest
+
+from sql_templates import TemplateRouter
+
+VOCABULARY = {"regions": ["CA", "TX"], "categories": ["Electronics", "Books"]}
+
+
+class TemplateRouterTest(unittest.TestCase):
+    def setUp(self):
+        self.router = TemplateRouter(VOCABULARY, default_limit=10, max_limit=20)
+
+    def test_routes_common_shapes(self):
+        cases = {
+            "Show me the top 5 customers by revenue": "top_customers_by_revenue",
+            "sales by category in CA": "sales_by_category",
+            "What is the total revenue by region?": "sales_by_region",
+            "How many orders per month": "orders_by_month",
+            "number of orders by month for the last 6 months": "orders_by_month",
+        }
+        for question, name in cases.items():
+            with self.subTest(question=question):
+                self.assertEqual(self.router.match(question).name, name)
+
+    def test_top_n_is_clamped(self):
+        self.assertEqual(self.router.match("top 5 customers").params["n"], 5)
+        self.assertEqual(self.router.match("top ten customers").params["n"], 10)
+        self.assertEqual(self.router.match("top 0 customers").params["n"], 1)
+        self.assertEqual(self.router.match("top 100000 customers").params["n"], 20)
+        self.assertEqual(self.router.match("top customers").params["n"], 10)
+
+    def test_count_questions_go_to_the_agent(self):
+        for question in ("How many top customers?", "how many top 5 customers in CA"):
+            with self.subTest(question=question):
+                self.assertIsNone(self.router.match(question))
+
+    def test_filters_become_parameters(self):
+        match = self.router.match("top 3 customers in TX in 2023")
+        self.assertEqual(match.params, {"region": "TX", "period_year": "2023", "n": 3})
+        self.assertIn("LIMIT 3", match.display_sql())
+        self.assertIn("'TX'", match.display_sql())
+
+    def test_unknown_questions_miss(self):
+        self.assertIsNone(self.router.match("which customers bought books and electronics"))
+        self.assertEqual(self.router.misses, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()